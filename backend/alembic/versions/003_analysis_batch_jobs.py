@@ -0,0 +1,40 @@
+"""Add analysis batch jobs
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "analysis_batch_jobs",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("batch_id", sa.String(length=100), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=True),
+        sa.Column("types", postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column("ad_ids", postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column("request_count", sa.Integer(), nullable=True),
+        sa.Column("succeeded_count", sa.Integer(), nullable=True),
+        sa.Column("failed_count", sa.Integer(), nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("submitted_at", sa.DateTime(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("batch_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("analysis_batch_jobs")
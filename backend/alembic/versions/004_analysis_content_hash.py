@@ -0,0 +1,38 @@
+"""Add analysis content hashes
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ("ads_analysis_image", "ads_analysis_copy"):
+        op.add_column(table, sa.Column("content_hash", sa.String(64), nullable=True))
+        op.create_index(f"ix_{table}_content_hash", table, ["content_hash"])
+
+    op.add_column(
+        "analysis_batch_jobs",
+        sa.Column(
+            "content_keys", postgresql.JSON(astext_type=sa.Text()), nullable=True
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("analysis_batch_jobs", "content_keys")
+
+    for table in ("ads_analysis_image", "ads_analysis_copy"):
+        op.drop_index(f"ix_{table}_content_hash", table_name=table)
+        op.drop_column(table, "content_hash")
@@ -1,6 +1,8 @@
+import hashlib
+import json
 import math
 from typing import Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import func, select
@@ -8,6 +10,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.api.deps import get_db
+from app.config import settings
+from app.core.task_dedup import task_dedup
 from app.models.ad import AdRaw, AdSuccessScore, CollectJob
 from app.schemas.ad import (
     AdDetail,
@@ -26,6 +30,26 @@ from app.services.screenshot import capture_screenshot
 router = APIRouter()
 
 
+def _collect_dedup_key(data: CollectJobCreate) -> str:
+    """Queued marker key shared by identical collect requests."""
+    params = [sorted(data.keywords), data.industry, data.country, data.limit]
+    digest = hashlib.sha256(json.dumps(params, ensure_ascii=False).encode())
+    return f"job:{digest.hexdigest()}"
+
+
+async def _active_job(db: AsyncSession, job_id: Optional[str]) -> Optional[CollectJob]:
+    """The job of a queued marker, if it is still pending or running."""
+    if not job_id:
+        return None
+    result = await db.execute(
+        select(CollectJob).where(
+            CollectJob.job_id == UUID(job_id),
+            CollectJob.status.in_(("pending", "running")),
+        )
+    )
+    return result.scalar_one_or_none()
+
+
 @router.post("/collect", response_model=CollectJobResponse, status_code=201)
 async def create_collect_job(
     data: CollectJobCreate,
@@ -35,9 +59,33 @@ async def create_collect_job(
     Start a new ad collection job.
 
     This will queue a background task to fetch ads from Meta Ad Library.
+    An identical request made while its job is still queued or running
+    returns that job instead of starting another.
     """
+    # Estimate time (roughly 2 seconds per ad, spread over snapshot workers)
+    estimated_time = math.ceil(data.limit * 2 / settings.snapshot_download_workers)
+
+    job_id = uuid4()
+    dedup_key = _collect_dedup_key(data)
+    if not await task_dedup.claim("collect", [dedup_key], value=str(job_id)):
+        queued_id = await task_dedup.claimed_value("collect", dedup_key)
+        existing = await _active_job(db, queued_id)
+        if existing:
+            return CollectJobResponse(
+                job_id=existing.job_id,
+                status=existing.status,
+                estimated_time=estimated_time,
+            )
+        # The marker outlived its job; point it at the new one. If another
+        # request took it over first, leave the marker to that request.
+        if not await task_dedup.replace(
+            "collect", dedup_key, str(job_id), expected=queued_id
+        ):
+            dedup_key = None
+
     # Create job record
     job = CollectJob(
+        job_id=job_id,
         keywords=data.keywords,
         industry=data.industry,
         country=data.country,
@@ -55,11 +103,9 @@ async def create_collect_job(
         industry=data.industry,
         country=data.country,
         limit=data.limit,
+        dedup_key=dedup_key,
     )
 
-    # Estimate time (roughly 2 seconds per ad)
-    estimated_time = data.limit * 2
-
     return CollectJobResponse(
         job_id=job.job_id,
         status=job.status,
@@ -1,17 +1,40 @@
 from typing import List
 
+from celery.result import AsyncResult
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db
-from app.models.ad import AdRaw, AdsAnalysisCopy, AdsAnalysisImage
+from app.core.rate_limit import anthropic_limiter
+from app.core.task_dedup import task_dedup
+from app.models.ad import AdRaw, AdsAnalysisCopy, AdsAnalysisImage, AnalysisBatchJob
 from app.schemas.analysis import (
+    AnalysisBacklogRequest,
+    AnalysisBacklogResponse,
+    AnalysisBatchJobResponse,
     AnalysisBatchRequest,
     AnalysisBatchResponse,
+    AnalysisBatchStatusResponse,
+    AnalysisBulkRequest,
     AnalysisQueueResponse,
+    LaneMetricsResponse,
+    RateLimitMetricsResponse,
+    TaskDedupMetricsResponse,
 )
-from app.workers.analyze_task import analyze_batch, analyze_copy, analyze_image
+from app.services.analyzer import analyzer
+from app.workers.analyze_task import (
+    analyze_ad,
+    analyze_batch,
+    analyze_bulk,
+    analyze_copy,
+    analyze_image,
+    claim_analysis,
+    queue_for_batch,
+    scan_analysis_backlog,
+)
+from app.workers.celery_app import celery_app
+from app.workers.lanes import lane_metrics
 
 router = APIRouter()
 
@@ -33,8 +56,8 @@ async def queue_image_analysis(
     if not ad:
         raise HTTPException(status_code=404, detail="Ad not found")
 
-    if not ad.image_url and not ad.ad_snapshot_url:
-        raise HTTPException(status_code=400, detail="No image URL for this ad")
+    if not (ad.image_s3_path or ad.image_url or ad.ad_snapshot_url):
+        raise HTTPException(status_code=400, detail="No image for this ad")
 
     # Check if already analyzed
     existing = await db.execute(
@@ -46,8 +69,16 @@ async def queue_image_analysis(
             message="Image analysis already exists for this ad",
         )
 
+    # Skip if a request for it is still queued or running
+    claimed = await task_dedup.claim("analysis", [f"image:{ad_id}"])
+    if not claimed:
+        return AnalysisQueueResponse(
+            status="already_queued",
+            message="Image analysis is already queued for this ad",
+        )
+
     # Queue task
-    analyze_image.delay(ad_id)
+    analyze_image.delay(ad_id, claimed=claimed)
 
     return AnalysisQueueResponse(
         status="queued",
@@ -85,8 +116,16 @@ async def queue_copy_analysis(
             message="Copy analysis already exists for this ad",
         )
 
+    # Skip if a request for it is still queued or running
+    claimed = await task_dedup.claim("analysis", [f"copy:{ad_id}"])
+    if not claimed:
+        return AnalysisQueueResponse(
+            status="already_queued",
+            message="Copy analysis is already queued for this ad",
+        )
+
     # Queue task
-    analyze_copy.delay(ad_id)
+    analyze_copy.delay(ad_id, claimed=claimed)
 
     return AnalysisQueueResponse(
         status="queued",
@@ -94,6 +133,46 @@ async def queue_copy_analysis(
     )
 
 
+@router.post("/ad/{ad_id}", response_model=AnalysisQueueResponse, status_code=202)
+async def queue_ad_analysis(
+    ad_id: str,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Queue image and copy analysis for an ad as one combined Claude call.
+
+    If one of them is already queued by an earlier request, only the other
+    is queued. The analysis will be processed in the background.
+    """
+    # Check if ad exists
+    result = await db.execute(select(AdRaw).where(AdRaw.ad_id == ad_id))
+    ad = result.scalar_one_or_none()
+
+    if not ad:
+        raise HTTPException(status_code=404, detail="Ad not found")
+
+    # Skip if a request for both is still queued or running
+    claimed = await task_dedup.claim("analysis", [f"image:{ad_id}", f"copy:{ad_id}"])
+    if not claimed:
+        return AnalysisQueueResponse(
+            status="already_queued",
+            message="Ad analysis is already queued for this ad",
+        )
+
+    # Queue task; a type queued by an earlier request is left to it
+    if len(claimed) == 2:
+        analyze_ad.delay(ad_id, claimed=claimed)
+    elif claimed == [f"image:{ad_id}"]:
+        analyze_image.delay(ad_id, claimed=claimed)
+    else:
+        analyze_copy.delay(ad_id, claimed=claimed)
+
+    return AnalysisQueueResponse(
+        status="queued",
+        message="Ad analysis queued successfully",
+    )
+
+
 @router.post("/batch", response_model=AnalysisBatchResponse, status_code=202)
 async def queue_batch_analysis(
     data: AnalysisBatchRequest,
@@ -102,49 +181,136 @@ async def queue_batch_analysis(
     """
     Queue analysis for multiple ads.
 
-    Ads that already have analysis will be skipped.
+    Ads that already have analysis, or are queued by an earlier request,
+    will be skipped.
     """
+    # Existence and analysis status of every ID in one query
+    targets = await analyzer.load_targets(db, data.ad_ids)
+
     queued_ids: List[str] = []
     skipped_count = 0
 
-    for ad_id in data.ad_ids:
-        # Check if ad exists
-        result = await db.execute(select(AdRaw).where(AdRaw.ad_id == ad_id))
-        ad = result.scalar_one_or_none()
-
-        if not ad:
+    for ad_id in dict.fromkeys(data.ad_ids):
+        target = targets.get(ad_id)
+        if not target:
             skipped_count += 1
             continue
 
         # Check which analyses are needed
-        needs_image = "image" in data.types
-        needs_copy = "copy" in data.types
-
-        if needs_image:
-            existing = await db.execute(
-                select(AdsAnalysisImage).where(AdsAnalysisImage.ad_id == ad_id)
-            )
-            if existing.scalar_one_or_none():
-                needs_image = False
-
-        if needs_copy:
-            existing = await db.execute(
-                select(AdsAnalysisCopy).where(AdsAnalysisCopy.ad_id == ad_id)
-            )
-            if existing.scalar_one_or_none():
-                needs_copy = False
-
-        if needs_image or needs_copy:
+        _, done = target
+        if any(t in data.types and t not in done for t in ("image", "copy")):
             queued_ids.append(ad_id)
         else:
             skipped_count += 1
 
+    # Ads queued by an overlapping request count as skipped
+    claimed_ids, claimed = await claim_analysis(queued_ids, data.types)
+    skipped_count += len(queued_ids) - len(claimed_ids)
+    queued_ids = claimed_ids
+
     # Queue batch task if there are ads to analyze
+    task_id = None
     if queued_ids:
-        analyze_batch.delay(queued_ids, data.types)
+        task_id = analyze_batch.apply_async(
+            (queued_ids, data.types, data.combined),
+            kwargs={"claimed": claimed},
+            queue=queue_for_batch(queued_ids),
+        ).id
 
     return AnalysisBatchResponse(
         queued_count=len(queued_ids),
         skipped_count=skipped_count,
         message=f"Queued {len(queued_ids)} ads for analysis, skipped {skipped_count}",
+        task_id=task_id,
+    )
+
+
+@router.get("/batch/{task_id}", response_model=AnalysisBatchStatusResponse)
+async def get_batch_analysis_status(task_id: str):
+    """
+    Get progress of a batch analysis task.
+
+    Per-ad results are included once the task has finished.
+    """
+    task = AsyncResult(task_id, app=celery_app)
+
+    if task.state == "FAILURE":
+        return AnalysisBatchStatusResponse(
+            task_id=task_id, state=task.state, error=str(task.result)
+        )
+
+    info = task.info if isinstance(task.info, dict) else {}
+    return AnalysisBatchStatusResponse(task_id=task_id, state=task.state, **info)
+
+
+@router.post("/bulk", response_model=AnalysisQueueResponse, status_code=202)
+async def queue_bulk_analysis(data: AnalysisBulkRequest):
+    """
+    Queue analysis of many ads through the Message Batches API.
+
+    Results arrive asynchronously, typically within hours; ads that already
+    have analysis are skipped when the batches are submitted.
+    """
+    analyze_bulk.delay(data.ad_ids, data.types)
+
+    return AnalysisQueueResponse(
+        status="queued",
+        message=f"Queued {len(data.ad_ids)} ads for bulk analysis",
     )
+
+
+@router.get("/bulk/{batch_id}", response_model=AnalysisBatchJobResponse)
+async def get_bulk_analysis_status(
+    batch_id: str,
+    db: AsyncSession = Depends(get_db),
+):
+    """Get status of a submitted message batch."""
+    result = await db.execute(
+        select(AnalysisBatchJob).where(AnalysisBatchJob.batch_id == batch_id)
+    )
+    job = result.scalar_one_or_none()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return job
+
+
+@router.post("/backlog", response_model=AnalysisBacklogResponse, status_code=202)
+async def queue_backlog_analysis(data: AnalysisBacklogRequest):
+    """
+    Queue analysis of every ad that still needs it.
+
+    A background scan finds the ads and feeds them to the analyze queue in
+    throttled chunks; the caller does not list ad IDs.
+    """
+    task = scan_analysis_backlog.delay(
+        types=data.types,
+        industry=data.industry,
+        collected_from=data.collected_from.isoformat() if data.collected_from else None,
+        collected_to=data.collected_to.isoformat() if data.collected_to else None,
+        combined=data.combined,
+    )
+
+    return AnalysisBacklogResponse(
+        message="Backlog scan queued",
+        task_id=task.id,
+    )
+
+
+@router.get("/rate-limit", response_model=RateLimitMetricsResponse)
+async def get_rate_limit_metrics():
+    """Get wait metrics of the shared Anthropic rate limiter."""
+    return await anthropic_limiter.get_metrics()
+
+
+@router.get("/dedup", response_model=TaskDedupMetricsResponse)
+async def get_dedup_metrics():
+    """Get duplicate suppression metrics of analysis and collection tasks."""
+    return await task_dedup.get_metrics()
+
+
+@router.get("/lanes", response_model=List[LaneMetricsResponse])
+def get_lane_metrics():
+    """Get depth and queue wait of the interactive, backfill and collect queues."""
+    return lane_metrics.get_metrics()
@@ -1,6 +1,6 @@
 """Monitoring API endpoints."""
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -10,11 +10,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.api.deps import get_db
+from app.core.task_dedup import task_dedup
 from app.models.ad import MonitoringKeyword, MonitoringRun, Notification
 from app.workers.collect_task import collect_ads
 
 router = APIRouter()
 
+# Incremental runs re-fetch this much before the last successful run to cover
+# timezones
+INCREMENTAL_OVERLAP = timedelta(days=1)
+
 
 # Request/Response Models
 class KeywordCreate(BaseModel):
@@ -43,6 +48,7 @@ class KeywordResponse(BaseModel):
     is_active: bool
     schedule_cron: str
     last_run_at: Optional[datetime]
+    last_success_at: Optional[datetime]
     next_run_at: Optional[datetime]
     created_at: datetime
 
@@ -180,13 +186,37 @@ async def delete_keyword(
     return None
 
 
+async def _active_run(
+    db: AsyncSession, keyword_id: int, run_id: Optional[str]
+) -> Optional[MonitoringRun]:
+    """The keyword's run of a queued marker, if it is still pending or running."""
+    if not run_id or not run_id.isdigit():
+        return None
+    result = await db.execute(
+        select(MonitoringRun).where(
+            MonitoringRun.id == int(run_id),
+            MonitoringRun.keyword_id == keyword_id,
+            MonitoringRun.status.in_(("pending", "running")),
+        )
+    )
+    return result.scalar_one_or_none()
+
+
 @router.post("/keywords/{keyword_id}/run", response_model=RunResponse)
 async def run_keyword(
     keyword_id: int,
     db: AsyncSession = Depends(get_db),
     limit: int = Query(50, ge=1, le=200, description="Number of ads to collect"),
+    full: bool = Query(False, description="Ignore the last run and collect all ads"),
 ):
-    """Immediately run collection for a keyword."""
+    """
+    Immediately run collection for a keyword.
+
+    After the first successful run only ads delivered since the last
+    successful run are requested, and paging stops at the first page of
+    already stored ads. While a run of the keyword is queued or running,
+    that run is returned instead of starting another.
+    """
     result = await db.execute(
         select(MonitoringKeyword).where(MonitoringKeyword.id == keyword_id)
     )
@@ -205,6 +235,26 @@ async def run_keyword(
     await db.commit()
     await db.refresh(run)
 
+    # The run is committed first so concurrent requests see the marker's run
+    dedup_key = f"keyword:{keyword_id}"
+    if not await task_dedup.claim("collect", [dedup_key], value=str(run.id)):
+        queued_id = await task_dedup.claimed_value("collect", dedup_key)
+        existing = await _active_run(db, keyword_id, queued_id)
+        if existing:
+            await db.delete(run)
+            await db.commit()
+            return existing
+        # The marker outlived its run; point it at the new one. If another
+        # request took it over first, leave the marker to that request.
+        if not await task_dedup.replace(
+            "collect", dedup_key, str(run.id), expected=queued_id
+        ):
+            dedup_key = None
+
+    delivered_since = None
+    if keyword.last_success_at and not full:
+        delivered_since = (keyword.last_success_at - INCREMENTAL_OVERLAP).date()
+
     # Queue collection task
     collect_ads.delay(
         job_id=f"monitoring-{run.id}",
@@ -212,6 +262,9 @@ async def run_keyword(
         industry=keyword.industry,
         country=keyword.country,
         limit=limit,
+        delivered_since=delivered_since.isoformat() if delivered_since else None,
+        stop_at_known=not full,
+        dedup_key=dedup_key,
     )
 
     # Update keyword last run
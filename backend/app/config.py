@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import List
+from typing import List, Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -28,9 +28,78 @@ class Settings(BaseSettings):
 
     # Claude API
     anthropic_api_key: str = ""
+    anthropic_timeout: float = 120.0
+    anthropic_max_retries: int = 2
+    anthropic_base_url: Optional[str] = None  # e.g. a local stand-in
+    # Shared by all processes through Redis; set to the organization's limits
+    anthropic_rate_limit_enabled: bool = True
+    anthropic_rpm_limit: int = 50  # requests per minute
+    anthropic_tpm_limit: int = 40000  # input + output tokens per minute
+    anthropic_rate_limit_max_wait: float = 300.0  # seconds
+
+    # Message Batches (bulk analysis)
+    claude_batch_max_requests: int = 200  # requests per submitted batch
+    claude_batch_poll_interval: int = 60  # seconds between status checks
+
+    # Batch analysis
+    analysis_batch_concurrency: int = 8  # ads in flight per batch task
+    analysis_commit_every: int = 20  # analyses per commit
+    # Analyze image and copy of an ad in one Claude call
+    analysis_combined: bool = False
+    # Return results as tool input validated against a schema, re-asking
+    # only for fields that fail validation
+    analysis_structured_output: bool = True
+    analysis_repair_attempts: int = 1
+    # Larger analyze_batch tasks go to the backfill queue, not the interactive one
+    analysis_interactive_max_ads: int = 10
+
+    # Backlog scanner (scan_analysis_backlog task)
+    analysis_scan_page_size: int = 1000  # ads per keyset page
+    analysis_scan_chunk_size: int = 50  # ads per queued analyze_batch task
+    analysis_scan_max_queued: int = 20  # backfill queue depth that pauses the scan
+    analysis_scan_pause: int = 30  # seconds before a paused scan resumes
+
+    # Duplicate task suppression (queued markers and in-flight leases in Redis)
+    task_dedup_enabled: bool = True
+    task_dedup_ttl: int = 3600  # seconds a queued marker outlives a lost task
+    task_lock_lease: int = 60  # seconds; renewed while the task runs
+
+    # Analysis result cache
+    analysis_cache_enabled: bool = True
+    analysis_cache_ttl: int = 30 * 24 * 3600  # seconds
+
+    # Image normalization before vision analysis (resizing needs Pillow)
+    image_max_edge: int = 1568  # px; larger images are downscaled
+    image_format: Literal["webp", "jpeg", "png"] = "webp"
+    image_quality: int = 85
+    # Local copies of S3 images read for analysis
+    image_cache_dir: str = "/tmp/ad_image_cache"
+    image_cache_max_mb: int = 2048
 
     # Meta API
     meta_access_token: str = ""
+    meta_ad_library_url: str = "https://graph.facebook.com/v18.0/ads_archive"
+    collector_max_concurrent_terms: int = 4
+    collector_max_concurrent_pages: int = 8
+    collector_max_buffered_pages: int = 4
+    collector_max_retries: int = 5
+    collector_backoff_base: float = 1.0
+    collector_backoff_max: float = 60.0
+    collector_usage_slowdown_pct: float = 75.0
+    collector_usage_pause_pct: float = 95.0
+
+    # Ingestion
+    # Inserts of this many rows or more use COPY instead of INSERT
+    ingest_copy_threshold: int = 1000
+    snapshot_download_workers: int = 8
+    snapshot_upload_workers: int = 4
+    snapshot_queue_size: int = 32
+
+    # HTTP client pools
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http2_enabled: bool = False
 
     # App
     debug: bool = True
@@ -1,19 +1,32 @@
+import asyncio
 import base64
+import hashlib
 import json
 import logging
-from typing import Any, Dict, Optional
+import weakref
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
 
 import anthropic
-import httpx
+from pydantic import BaseModel, ValidationError
 
 from app.config import settings
+from app.core.http import http_clients
+from app.core.image import normalize_image, pillow_available
+from app.core.rate_limit import anthropic_limiter, estimate_tokens, usage_tokens
+from app.schemas.analysis_output import (
+    CombinedAnalysisOutput,
+    CopyAnalysisOutput,
+    ImageAnalysisOutput,
+)
 
 logger = logging.getLogger(__name__)
 
-# Image Analysis Prompt
+# Image Analysis Prompt (static instructions)
 IMAGE_ANALYSIS_PROMPT = """# 광고 이미지 분석 요청
 
-다음 광고 이미지를 분석하여 JSON 형식으로 응답해주세요.
+사용자가 보내는 광고 이미지를 분석하여 JSON 형식으로 응답해주세요.
 
 ## 분석 항목
 
@@ -68,17 +81,10 @@ IMAGE_ANALYSIS_PROMPT = """# 광고 이미지 분석 요청
 
 주의: JSON 외 다른 텍스트 없이 순수 JSON만 응답해주세요."""
 
-# Copy Analysis Prompt Template
+# Copy Analysis Prompt (static instructions; the copy itself is sent separately)
 COPY_ANALYSIS_PROMPT = """# 광고 카피 분석 요청
 
-다음 광고 카피를 분석하여 JSON 형식으로 응답해주세요.
-
-## 광고 카피
----
-{body}
----
-{title}
----
+사용자가 보내는 광고 카피를 분석하여 JSON 형식으로 응답해주세요.
 
 ## 분석 항목
 
@@ -112,46 +118,208 @@ COPY_ANALYSIS_PROMPT = """# 광고 카피 분석 요청
 ## 응답 형식 (JSON만 응답)
 
 ```json
-{{
-  "structure": {{
+{
+  "structure": {
     "headline": "목동 입시생 83%가 선택한 이유",
     "headline_length": 16,
     "body": "소규모 맞춤 관리로 평균 2등급 상승",
     "cta": "상담 신청하기",
     "core_message": "social_proof"
-  }},
+  },
   "numbers": [
-    {{"value": 83, "unit": "%", "context": "선택률"}},
-    {{"value": 2, "unit": "등급", "context": "성적 향상"}}
+    {"value": 83, "unit": "%", "context": "선택률"},
+    {"value": 2, "unit": "등급", "context": "성적 향상"}
   ],
-  "offer": {{
+  "offer": {
     "discount_info": null,
     "free_benefit": "무료 학습 진단",
     "social_proof": "83% 선택",
     "urgency": null,
     "differentiation": "소규모 맞춤 관리"
-  }},
-  "tone": {{
+  },
+  "tone": {
     "formality": "formal",
     "emotion": "rational",
     "style": "stable"
-  }},
+  },
   "target_audience": "고등학생",
   "keywords": ["선택", "소규모", "맞춤", "관리", "등급", "상승"],
   "regions": ["목동"]
-}}
+}
 ```
 
 주의: JSON 외 다른 텍스트 없이 순수 JSON만 응답해주세요."""
 
+# Per-ad copy message
+COPY_ANALYSIS_INPUT = """## 광고 카피
+---
+{body}
+---
+{title}
+---"""
+
+# Per-ad image message, sent after the image
+IMAGE_ANALYSIS_INPUT = "이 광고 이미지를 분석해주세요."
+
+# Combined Analysis Prompt: both instruction sets verbatim, so each section
+# matches what the separate prompts return (and can share their cache keys)
+COMBINED_ANALYSIS_PROMPT = f"""# 광고 통합 분석 요청
+
+사용자가 보내는 광고 이미지와 광고 카피를 함께 분석하여 하나의 JSON으로 응답해주세요.
+
+- "image": 아래 [이미지 분석] 지침에 따른 결과
+- "copy": 아래 [카피 분석] 지침에 따른 결과
+
+각 지침의 "응답 형식"은 해당 키에 들어갈 값의 형식입니다.
+
+## 응답 형식 (JSON만 응답)
+
+```json
+{{"image": {{ ... }}, "copy": {{ ... }}}}
+```
+
+## [이미지 분석]
+
+{IMAGE_ANALYSIS_PROMPT}
+
+## [카피 분석]
+
+{COPY_ANALYSIS_PROMPT}"""
+
+# Per-ad combined message, sent after the image
+COMBINED_ANALYSIS_INPUT = (
+    COPY_ANALYSIS_INPUT + "\n\n위 광고 이미지와 카피를 함께 분석해주세요."
+)
+
+# Marks the static instructions as a cacheable prompt prefix
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Structured output: analysis type -> model its tool input is validated with
+OUTPUT_MODELS: Dict[str, Type[BaseModel]] = {
+    "image": ImageAnalysisOutput,
+    "copy": CopyAnalysisOutput,
+    "combined": CombinedAnalysisOutput,
+}
+
+OUTPUT_TOOL_DESCRIPTIONS = {
+    "image": "광고 이미지 분석 결과를 기록합니다.",
+    "copy": "광고 카피 분석 결과를 기록합니다.",
+    "combined": "광고 이미지와 카피의 통합 분석 결과를 기록합니다.",
+}
+
+# Asks again for the fields that failed validation
+REPAIR_ERROR = "다음 항목이 형식에 맞지 않습니다:\n{errors}"
+REPAIR_INPUT = "{fields} 항목만 형식에 맞게 다시 작성해주세요."
+
+# Price of a cached input token relative to an uncached one
+CACHE_READ_PRICE = 0.1
+
+
+def _prompt_version(*parts: str) -> str:
+    """Short fingerprint of everything that shapes an analysis result."""
+    return hashlib.sha256("\x00".join(parts).encode()).hexdigest()[:16]
+
+
+def _inline_refs(schema: Any, defs: Optional[Dict[str, Any]] = None) -> Any:
+    """Resolve ``$ref``s of a pydantic JSON schema into one self-contained schema."""
+    if defs is None and isinstance(schema, dict):
+        defs = schema.get("$defs", {})
+    if isinstance(schema, dict):
+        if "$ref" in schema:
+            return _inline_refs(defs[schema["$ref"].split("/")[-1]], defs)
+        return {
+            key: _inline_refs(value, defs)
+            for key, value in schema.items()
+            if key not in ("$defs", "title")
+        }
+    if isinstance(schema, list):
+        return [_inline_refs(item, defs) for item in schema]
+    return schema
+
+
+def _output_tool(kind: str) -> Dict[str, Any]:
+    """Tool whose input is the structured result of an analysis type."""
+    return {
+        "name": f"record_{kind}_analysis",
+        "description": OUTPUT_TOOL_DESCRIPTIONS[kind],
+        "input_schema": _inline_refs(OUTPUT_MODELS[kind].model_json_schema()),
+    }
+
+
+# Built once at import; also part of the prompt versions
+OUTPUT_TOOLS = {kind: _output_tool(kind) for kind in OUTPUT_MODELS}
+TOOL_KINDS = {tool["name"]: kind for kind, tool in OUTPUT_TOOLS.items()}
+
+
+@dataclass
+class PromptCacheStats:
+    """Running prompt cache usage."""
+
+    calls: int = 0
+    cache_hits: int = 0
+    input_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        """Input tokens not billed at full price (cache reads cost 10%)."""
+        return int(self.cache_read_tokens * (1 - CACHE_READ_PRICE))
+
 
 class ClaudeClient:
     """Claude API client for image and text analysis."""
 
     def __init__(self):
         self.api_key = settings.anthropic_api_key
-        self.client = anthropic.Anthropic(api_key=self.api_key)
         self.model = "claude-sonnet-4-20250514"
+        # Part of analysis cache keys; changes whenever a prompt does
+        self.image_prompt_version = _prompt_version(
+            self.model,
+            IMAGE_ANALYSIS_PROMPT,
+            IMAGE_ANALYSIS_INPUT,
+            self._output_version("image"),
+            # The model sees the normalized image, not the downloaded one
+            f"{settings.image_max_edge}/{settings.image_format}"
+            f"/{settings.image_quality}",
+        )
+        self.copy_prompt_version = _prompt_version(
+            self.model,
+            COPY_ANALYSIS_PROMPT,
+            COPY_ANALYSIS_INPUT,
+            self._output_version("copy"),
+        )
+        if not pillow_available():
+            logger.warning("Pillow is not installed; images are sent unresized")
+        # Prompt cache usage in this process, per analysis type
+        self.cache_stats: Dict[str, PromptCacheStats] = defaultdict(PromptCacheStats)
+        # event loop -> client; an async client is tied to the loop it runs on
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    @property
+    def client(self) -> anthropic.AsyncAnthropic:
+        """Async Anthropic client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = anthropic.AsyncAnthropic(
+                api_key=self.api_key,
+                base_url=settings.anthropic_base_url,
+                timeout=settings.anthropic_timeout,
+                max_retries=settings.anthropic_max_retries,
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close the client of the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    def reset(self) -> None:
+        """Forget all clients without closing them (e.g. after fork)."""
+        self._clients = weakref.WeakKeyDictionary()
 
     async def analyze_image(self, image_url: str) -> Optional[Dict[str, Any]]:
         """
@@ -164,47 +332,28 @@ class ClaudeClient:
             Parsed analysis result or None if failed
         """
         try:
-            # Download image
-            async with httpx.AsyncClient(timeout=30.0) as http_client:
-                response = await http_client.get(image_url)
-                response.raise_for_status()
-                image_data = response.content
-
-            # Encode to base64
-            image_base64 = base64.standard_b64encode(image_data).decode("utf-8")
-
-            # Determine media type
-            content_type = response.headers.get("content-type", "image/png")
-            media_type = content_type.split(";")[0].strip()
-
-            # Call Claude API
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": media_type,
-                                    "data": image_base64,
-                                },
-                            },
-                            {
-                                "type": "text",
-                                "text": IMAGE_ANALYSIS_PROMPT,
-                            },
-                        ],
-                    }
-                ],
-            )
+            image_data = await self.download_image(image_url)
+        except Exception as e:
+            logger.error(f"Error downloading image: {e}")
+            return None
+
+        return await self.analyze_image_data(image_data)
+
+    async def analyze_image_data(self, image_data: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Analyze ad image bytes using Claude Vision.
+
+        Args:
+            image_data: Downloaded image bytes; normalized before sending
 
-            # Parse response
-            response_text = message.content[0].text
-            return self._parse_json_response(response_text)
+        Returns:
+            Parsed analysis result or None if failed
+        """
+        try:
+            image_data, media_type = await self.prepare_image(image_data)
+            return await self._analyze(
+                "image", self.image_request(image_data, media_type)
+            )
 
         except Exception as e:
             logger.error(f"Error analyzing image: {e}")
@@ -227,28 +376,442 @@ class ClaudeClient:
             return None
 
         try:
-            prompt = COPY_ANALYSIS_PROMPT.format(
-                body=body or "(없음)",
-                title=title or "(없음)",
+            return await self._analyze("copy", self.copy_request(body, title))
+
+        except Exception as e:
+            logger.error(f"Error analyzing copy: {e}")
+            return None
+
+    async def analyze_ad(
+        self,
+        image_data: bytes,
+        body: Optional[str],
+        title: Optional[str],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Analyze the image and copy of an ad in a single call.
+
+        Args:
+            image_data: Downloaded image bytes; normalized before sending
+            body: Ad creative body text
+            title: Ad creative link title
+
+        Returns:
+            ``{"image": ..., "copy": ...}``; a section that is missing or
+            malformed is None. None if the call failed.
+        """
+        try:
+            image_data, media_type = await self.prepare_image(image_data)
+            result = await self._analyze(
+                "combined", self.combined_request(image_data, media_type, body, title)
             )
 
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                messages=[
+        except Exception as e:
+            logger.error(f"Error analyzing ad: {e}")
+            return None
+
+        if not isinstance(result, dict):
+            return None
+        return {
+            section: (
+                result.get(section) if isinstance(result.get(section), dict) else None
+            )
+            for section in ("image", "copy")
+        }
+
+    async def download_image(self, image_url: str) -> bytes:
+        """Download an image for analysis, as served."""
+        http_client = http_clients.get("images")
+        response = await http_client.get(image_url)
+        response.raise_for_status()
+        return response.content
+
+    async def prepare_image(self, image_data: bytes) -> Tuple[bytes, str]:
+        """
+        Normalize downloaded image bytes for sending (see ``normalize_image``).
+
+        The media type comes from the bytes themselves, not from the
+        server's content-type header. Decoding and resizing run in a thread
+        so they do not stall other analyses on the event loop.
+
+        Returns:
+            Image bytes and their media type
+
+        Raises:
+            ValueError: If the payload is not a supported image
+        """
+        prepared, media_type = await asyncio.to_thread(normalize_image, image_data)
+        logger.debug(
+            f"Prepared image: {len(image_data)} -> {len(prepared)} bytes ({media_type})"
+        )
+        return prepared, media_type
+
+    def image_request(self, image_data: bytes, media_type: str) -> Dict[str, Any]:
+        """
+        Build Messages API parameters for an image analysis.
+
+        The instructions go in a cached system block, so only the image and
+        a one-line request are billed at the full input price.
+        """
+        # Encode to base64
+        image_base64 = base64.standard_b64encode(image_data).decode("utf-8")
+
+        return {
+            "model": self.model,
+            "max_tokens": 1024,
+            "system": [
+                {
+                    "type": "text",
+                    "text": IMAGE_ANALYSIS_PROMPT,
+                    "cache_control": CACHE_CONTROL,
+                }
+            ],
+            **self._output_params("image"),
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image",
+                            "source": {
+                                "type": "base64",
+                                "media_type": media_type,
+                                "data": image_base64,
+                            },
+                        },
+                        {
+                            "type": "text",
+                            "text": IMAGE_ANALYSIS_INPUT,
+                        },
+                    ],
+                }
+            ],
+        }
+
+    def copy_request(self, body: Optional[str], title: Optional[str]) -> Dict[str, Any]:
+        """Build Messages API parameters for a copy analysis."""
+        return {
+            "model": self.model,
+            "max_tokens": 1024,
+            "system": [
+                {
+                    "type": "text",
+                    "text": COPY_ANALYSIS_PROMPT,
+                    "cache_control": CACHE_CONTROL,
+                }
+            ],
+            **self._output_params("copy"),
+            "messages": [
+                {
+                    "role": "user",
+                    "content": COPY_ANALYSIS_INPUT.format(
+                        body=body or "(없음)",
+                        title=title or "(없음)",
+                    ),
+                }
+            ],
+        }
+
+    def combined_request(
+        self,
+        image_data: bytes,
+        media_type: str,
+        body: Optional[str],
+        title: Optional[str],
+    ) -> Dict[str, Any]:
+        """Build Messages API parameters for a combined image and copy analysis."""
+        image_base64 = base64.standard_b64encode(image_data).decode("utf-8")
+
+        return {
+            "model": self.model,
+            "max_tokens": 2048,
+            "system": [
+                {
+                    "type": "text",
+                    "text": COMBINED_ANALYSIS_PROMPT,
+                    "cache_control": CACHE_CONTROL,
+                }
+            ],
+            **self._output_params("combined"),
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image",
+                            "source": {
+                                "type": "base64",
+                                "media_type": media_type,
+                                "data": image_base64,
+                            },
+                        },
+                        {
+                            "type": "text",
+                            "text": COMBINED_ANALYSIS_INPUT.format(
+                                body=body or "(없음)",
+                                title=title or "(없음)",
+                            ),
+                        },
+                    ],
+                }
+            ],
+        }
+
+    async def create_batch(self, requests: List[Dict[str, Any]]) -> str:
+        """
+        Submit requests through the Message Batches API.
+
+        Args:
+            requests: ``{"custom_id": ..., "params": ...}`` items, with params
+                from ``image_request`` or ``copy_request``
+
+        Returns:
+            Message batch ID
+        """
+        batch = await self.client.messages.batches.create(requests=requests)
+        logger.info(f"Submitted message batch {batch.id} ({len(requests)} requests)")
+        return batch.id
+
+    async def get_batch(self, batch_id: str) -> Any:
+        """Get a message batch, including its ``processing_status``."""
+        return await self.client.messages.batches.retrieve(batch_id)
+
+    async def iter_batch_results(
+        self, batch_id: str
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Stream the results of an ended message batch.
+
+        Yields:
+            ``(custom_id, parsed result)``; the result is None when the
+            request errored, expired or returned unparsable or invalid output
+        """
+        async for entry in await self.client.messages.batches.results(batch_id):
+            if entry.result.type != "succeeded":
+                logger.error(f"Batch request {entry.custom_id} {entry.result.type}")
+                yield entry.custom_id, None
+                continue
+
+            message = entry.result.message
+            self._record_usage("batch", message.usage)
+            tool_use = self._tool_use(message)
+            if tool_use is None:
+                yield entry.custom_id, self._parse_json_response(
+                    message.content[0].text
+                )
+                continue
+
+            # Batch results cannot be repaired in the same conversation
+            kind = TOOL_KINDS.get(tool_use.name)
+            result, errors = self._validate(kind, tool_use.input)
+            if errors:
+                logger.error(
+                    f"Invalid output of batch request {entry.custom_id}: {errors}"
+                )
+            yield entry.custom_id, result
+
+    async def _analyze(
+        self, kind: str, params: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Send an analysis request and return its validated result.
+
+        With structured output, the result is the input of the forced tool
+        call, validated against ``OUTPUT_MODELS[kind]``. Fields that fail
+        validation are asked for again in the same conversation, up to
+        ``analysis_repair_attempts`` times, instead of re-running the whole
+        analysis. Otherwise the text response is parsed as JSON.
+
+        Args:
+            kind: Analysis type ("image", "copy", "combined")
+            params: Request parameters from the matching ``*_request``
+
+        Returns:
+            Analysis result or None if the output stayed unusable
+        """
+        message = await self._create_message(kind, params)
+        if not settings.analysis_structured_output:
+            return self._parse_json_response(message.content[0].text)
+
+        tool_use = self._tool_use(message)
+        if tool_use is None:
+            logger.error(f"Claude {kind} response has no tool call")
+            return None
+
+        data = tool_use.input
+        result, errors = self._validate(kind, data)
+        for attempt in range(settings.analysis_repair_attempts):
+            if not errors:
+                break
+            logger.warning(
+                f"Claude {kind} output invalid in {', '.join(errors)}; "
+                f"asking again (attempt {attempt + 1})"
+            )
+            repaired = await self._repair(kind, params, tool_use, errors)
+            data = {**data, **{k: v for k, v in repaired.items() if k in errors}}
+            result, errors = self._validate(kind, data)
+
+        if errors:
+            logger.error(f"Claude {kind} output invalid: {errors}")
+        return result
+
+    async def _repair(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        tool_use: Any,
+        errors: Dict[str, List[str]],
+    ) -> Dict[str, Any]:
+        """
+        Ask again for only the fields that failed validation.
+
+        The original request and tool call are replayed with the validation
+        errors as the tool result, and a tool restricted to the failed fields
+        is forced, so only those fields are generated again.
+
+        Returns:
+            Regenerated fields (empty if the response had no tool call)
+        """
+        tool = OUTPUT_TOOLS[kind]
+        schema = tool["input_schema"]
+        fields = list(errors)
+        repair_tool = {
+            "name": f"{tool['name']}_fix",
+            "description": tool["description"],
+            "input_schema": {
+                **schema,
+                "properties": {
+                    field: schema["properties"][field]
+                    for field in fields
+                    if field in schema["properties"]
+                },
+                "required": [f for f in fields if f in schema["properties"]],
+            },
+        }
+        error_lines = "\n".join(
+            f"- {field}: {message}"
+            for field, messages in errors.items()
+            for message in messages
+        )
+
+        message = await self._create_message(
+            f"{kind} repair",
+            {
+                **params,
+                "tools": [tool, repair_tool],
+                "tool_choice": {"type": "tool", "name": repair_tool["name"]},
+                "messages": params["messages"]
+                + [
+                    {
+                        "role": "assistant",
+                        "content": [
+                            {
+                                "type": "tool_use",
+                                "id": tool_use.id,
+                                "name": tool_use.name,
+                                "input": tool_use.input,
+                            }
+                        ],
+                    },
                     {
                         "role": "user",
-                        "content": prompt,
-                    }
+                        "content": [
+                            {
+                                "type": "tool_result",
+                                "tool_use_id": tool_use.id,
+                                "is_error": True,
+                                "content": REPAIR_ERROR.format(errors=error_lines),
+                            },
+                            {
+                                "type": "text",
+                                "text": REPAIR_INPUT.format(fields=", ".join(fields)),
+                            },
+                        ],
+                    },
                 ],
-            )
+            },
+        )
+        repaired = self._tool_use(message)
+        return repaired.input if repaired else {}
+
+    def _validate(
+        self, kind: Optional[str], data: Any
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, List[str]]]:
+        """
+        Validate tool input against the output model of ``kind``.
+
+        Returns:
+            The validated result (None if invalid) and the error messages
+            per top-level field
+        """
+        model = OUTPUT_MODELS.get(kind)
+        if model is None or not isinstance(data, dict):
+            return None, {"output": ["Unexpected tool call"]}
+        try:
+            return model.model_validate(data).model_dump(mode="json", by_alias=True), {}
+        except ValidationError as e:
+            errors: Dict[str, List[str]] = defaultdict(list)
+            for error in e.errors():
+                field = str(error["loc"][0]) if error["loc"] else "output"
+                location = ".".join(str(part) for part in error["loc"])
+                errors[field].append(f"{location}: {error['msg']}")
+            return None, dict(errors)
+
+    def _tool_use(self, message: Any) -> Any:
+        """First tool call of a response, or None."""
+        return next(
+            (block for block in message.content if block.type == "tool_use"), None
+        )
+
+    def _output_params(self, kind: str) -> Dict[str, Any]:
+        """Request parameters that force structured output, if enabled."""
+        if not settings.analysis_structured_output:
+            return {}
+        tool = OUTPUT_TOOLS[kind]
+        return {"tools": [tool], "tool_choice": {"type": "tool", "name": tool["name"]}}
+
+    def _output_version(self, kind: str) -> str:
+        """Output format part of a prompt version."""
+        if not settings.analysis_structured_output:
+            return "json"
+        return json.dumps(OUTPUT_TOOLS[kind], sort_keys=True, ensure_ascii=False)
+
+    async def _create_message(self, kind: str, params: Dict[str, Any]) -> Any:
+        """
+        Send a Messages API request within the shared rate limits.
 
-            response_text = message.content[0].text
-            return self._parse_json_response(response_text)
+        Args:
+            kind: Analysis type or other call kind, for usage logging
+            params: Request parameters, e.g. from ``image_request``
 
-        except Exception as e:
-            logger.error(f"Error analyzing copy: {e}")
-            return None
+        Returns:
+            API response message
+        """
+        estimated = estimate_tokens(params)
+        await anthropic_limiter.acquire(estimated)
+        message = await self.client.messages.create(**params)
+        self._record_usage(kind, message.usage)
+        await anthropic_limiter.settle(estimated, usage_tokens(message.usage))
+        return message
+
+    def _record_usage(self, kind: str, usage: Any) -> None:
+        """Track prompt cache hits and savings of one call."""
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+
+        stats = self.cache_stats[kind]
+        stats.calls += 1
+        stats.cache_hits += 1 if cache_read else 0
+        stats.input_tokens += usage.input_tokens
+        stats.cache_read_tokens += cache_read
+        stats.cache_write_tokens += cache_write
+
+        logger.info(
+            f"Claude {kind} call: {usage.input_tokens} input tokens, "
+            f"{cache_read} read from cache, {cache_write} written to cache "
+            f"(cache hits {stats.cache_hits}/{stats.calls}, "
+            f"{stats.tokens_saved} tokens saved)"
+        )
 
     def _parse_json_response(self, text: str) -> Optional[Dict[str, Any]]:
         """Parse JSON from Claude response."""
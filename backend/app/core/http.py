@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import weakref
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    """Whether the optional ``h2`` package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HttpClientRegistry:
+    """
+    Registry of shared, long-lived httpx clients.
+
+    Clients are keyed by name (one pool per upstream, e.g. the Graph API or
+    the snapshot CDN) so connection limits apply per host, and by event loop
+    because an httpx client cannot be used from a loop other than the one
+    it connected on. Celery tasks may run on more than one loop.
+    """
+
+    def __init__(self):
+        # event loop -> {name: client}; entries vanish with their loop
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._http2 = settings.http2_enabled and _http2_available()
+        if settings.http2_enabled and not self._http2:
+            logger.warning("HTTP/2 requested but the h2 package is not installed")
+
+    def get(self, name: str = "default", timeout: float = 30.0) -> httpx.AsyncClient:
+        """
+        Get the shared client for ``name`` on the running event loop.
+
+        Args:
+            name: Pool name, one per upstream host
+            timeout: Request timeout used when the client is first created
+
+        Returns:
+            A keep-alive client; do not close it, call ``aclose`` instead
+        """
+        loop = asyncio.get_running_loop()
+        clients = self._clients.setdefault(loop, {})
+
+        client = clients.get(name)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=timeout,
+                http2=self._http2,
+                limits=httpx.Limits(
+                    max_connections=settings.http_max_connections,
+                    max_keepalive_connections=settings.http_max_keepalive_connections,
+                    keepalive_expiry=settings.http_keepalive_expiry,
+                ),
+            )
+            clients[name] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close every client created on the running event loop."""
+        loop = asyncio.get_running_loop()
+        clients = self._clients.pop(loop, {})
+        for client in clients.values():
+            await client.aclose()
+        if clients:
+            logger.info(f"Closed {len(clients)} pooled HTTP clients")
+
+    def reset(self) -> None:
+        """Forget all clients without closing them (e.g. after fork)."""
+        self._clients = weakref.WeakKeyDictionary()
+
+
+# Singleton instance
+http_clients = HttpClientRegistry()
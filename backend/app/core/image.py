@@ -0,0 +1,91 @@
+import io
+from typing import Optional, Tuple
+
+from app.config import settings
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; images are then sent as downloaded
+    Image = None
+    ImageOps = None
+
+# Magic bytes of the image formats the Claude API accepts
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+
+def pillow_available() -> bool:
+    """Whether the optional Pillow package needed for resizing is installed."""
+    return Image is not None
+
+
+def sniff_media_type(data: bytes) -> Optional[str]:
+    """Media type from the file signature, or None if not a supported image."""
+    for signature, media_type in _SIGNATURES:
+        if data.startswith(signature):
+            return media_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def normalize_image(data: bytes) -> Tuple[bytes, str]:
+    """
+    Prepare image bytes for vision analysis.
+
+    Validates that the payload is an image, then (with Pillow installed)
+    applies the EXIF orientation, downscales so the longest edge is at most
+    ``image_max_edge``, drops metadata and re-encodes to ``image_format``.
+    Without Pillow the bytes are only validated.
+
+    Args:
+        data: Downloaded image bytes
+
+    Returns:
+        Image bytes and their media type
+
+    Raises:
+        ValueError: If the payload is not a supported image
+    """
+    media_type = sniff_media_type(data)
+    if media_type is None:
+        raise ValueError("Payload is not a PNG, JPEG, GIF or WebP image")
+
+    if Image is None:
+        return data, media_type
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(
+                (settings.image_max_edge, settings.image_max_edge),
+                Image.Resampling.LANCZOS,
+            )
+            return _encode(image)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Unreadable image: {e}") from e
+
+
+def _encode(image: "Image.Image") -> Tuple[bytes, str]:
+    """Re-encode without metadata in the configured format."""
+    pil_format, media_type = _FORMATS[settings.image_format]
+
+    if pil_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    buffer = io.BytesIO()
+    # No exif/icc arguments: metadata is not carried over
+    image.save(buffer, format=pil_format, quality=settings.image_quality)
+    return buffer.getvalue(), media_type
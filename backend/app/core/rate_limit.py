@@ -0,0 +1,325 @@
+import asyncio
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from app.config import settings
+from app.core.redis import redis_clients
+
+logger = logging.getLogger(__name__)
+
+# Tokens billed for one image of at most image_max_edge (about w * h / 750)
+IMAGE_TOKENS = 1600
+# Roughly two characters per token for Korean prompts
+CHARS_PER_TOKEN = 2
+
+# Buckets hold this many seconds of the per-minute limit, so a full bucket
+# cannot be spent in one burst (the API enforces limits over short windows)
+BURST_SECONDS = 10
+
+# Waiters that stop polling for this long lose their place in the queue
+STALE_WAITER_MS = 10_000
+# Interactive waiters queue this far ahead of background ones (see
+# interactive_requests); far beyond any arrival number
+PRIORITY_OFFSET = 2**40
+# Longest sleep between polls while waiting
+MAX_POLL_SECONDS = 1.0
+# Waits at least this long count as throttled in the metrics
+SLOW_WAIT_SECONDS = 0.1
+
+# Set in tasks serving UI requests, so their Claude calls are granted before
+# those of queued backfill work
+interactive_requests: ContextVar[bool] = ContextVar(
+    "interactive_requests", default=False
+)
+
+# Grant one request of `cost` tokens to the waiter at the head of the queue.
+#
+# KEYS: bucket hash, waiter queue (zset by arrival), waiter last-seen hash
+# ARGV: waiter id, queue position, requests/min, tokens/min, cost,
+#       stale waiter age (ms), burst (seconds)
+# Returns 0 when granted, otherwise milliseconds until a retry is worthwhile.
+ACQUIRE_SCRIPT = """
+local bucket, queue, seen = KEYS[1], KEYS[2], KEYS[3]
+local waiter, arrival = ARGV[1], tonumber(ARGV[2])
+local rpm, tpm = tonumber(ARGV[3]), tonumber(ARGV[4])
+local cost = math.min(tonumber(ARGV[5]), tpm)
+local stale_ms = tonumber(ARGV[6])
+local burst = tonumber(ARGV[7]) / 60
+local max_requests = math.max(1, rpm * burst)
+local max_tokens = math.max(cost, tpm * burst)
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+redis.call('ZADD', queue, 'NX', arrival, waiter)
+redis.call('HSET', seen, waiter, now)
+
+-- Drop waiters at the head that stopped polling (e.g. a killed worker)
+while true do
+    local head = redis.call('ZRANGE', queue, 0, 0)[1]
+    if head == nil or head == waiter then break end
+    local last = tonumber(redis.call('HGET', seen, head) or 0)
+    if now - last < stale_ms then break end
+    redis.call('ZREM', queue, head)
+    redis.call('HDEL', seen, head)
+end
+
+local state = redis.call('HMGET', bucket, 'requests', 'tokens', 'updated')
+local requests = tonumber(state[1]) or max_requests
+local tokens = tonumber(state[2]) or max_tokens
+local updated = tonumber(state[3]) or now
+local elapsed = math.max(0, now - updated)
+requests = math.min(max_requests, requests + elapsed * rpm / 60000)
+tokens = math.min(max_tokens, tokens + elapsed * tpm / 60000)
+
+local wait = 0
+if redis.call('ZRANGE', queue, 0, 0)[1] ~= waiter then
+    -- Not our turn; the head is served first
+    wait = 50
+elseif requests >= 1 and tokens >= cost then
+    requests = requests - 1
+    tokens = tokens - cost
+    redis.call('ZREM', queue, waiter)
+    redis.call('HDEL', seen, waiter)
+else
+    wait = math.max(
+        (1 - requests) * 60000 / rpm, (cost - tokens) * 60000 / tpm, 1
+    )
+end
+
+redis.call('HSET', bucket, 'requests', requests, 'tokens', tokens, 'updated', now)
+for _, key in ipairs(KEYS) do redis.call('PEXPIRE', key, 120000) end
+return math.ceil(wait)
+"""
+
+# Return over-reserved tokens (estimate minus actual usage) to the bucket.
+#
+# KEYS: bucket hash; ARGV: bucket capacity, tokens to return
+SETTLE_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens == nil then return 0 end
+tokens = math.min(tonumber(ARGV[1]), tokens + tonumber(ARGV[2]))
+redis.call('HSET', KEYS[1], 'tokens', tokens)
+return 1
+"""
+
+
+@dataclass
+class RateLimitStats:
+    """Running limiter waits in this process."""
+
+    acquired: int = 0
+    waited: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    timeouts: int = 0
+
+    @property
+    def average_wait(self) -> float:
+        """Average wait per acquired call, in seconds."""
+        return self.total_wait / self.acquired if self.acquired else 0.0
+
+
+class RateLimiter:
+    """
+    Token buckets for Anthropic requests/min and tokens/min, shared in Redis.
+
+    Every worker process and the API draw from the same two buckets, so
+    together they stay under the organization's rate limits instead of
+    each bursting into 429s. Callers queue in arrival order: a caller only
+    takes from the buckets once everyone who arrived before it has, so a
+    large request is not starved by a stream of small ones. Callers with
+    ``interactive_requests`` set queue ahead of all others.
+
+    Token costs are estimated up front and corrected with the actual usage
+    once the response arrives (see ``settle``). If Redis is unavailable,
+    calls go through unthrottled.
+    """
+
+    def __init__(self, name: str = "anthropic"):
+        self.name = name
+        self.stats = RateLimitStats()
+        # name -> registered script
+        self._scripts: Dict[str, Any] = {}
+
+    async def acquire(self, tokens: int) -> float:
+        """
+        Wait for a turn to send one request.
+
+        Args:
+            tokens: Estimated tokens of the request (see ``estimate_tokens``)
+
+        Returns:
+            Seconds waited
+
+        Raises:
+            TimeoutError: If no turn came within ``anthropic_rate_limit_max_wait``
+        """
+        if not settings.anthropic_rate_limit_enabled:
+            return 0.0
+
+        started = time.monotonic()
+        try:
+            redis = redis_clients.get()
+            script = self._script("acquire", ACQUIRE_SCRIPT, redis)
+            arrival = await redis.incr(self._key("arrivals"))
+            if interactive_requests.get():
+                arrival -= PRIORITY_OFFSET
+            waiter = uuid.uuid4().hex
+            keys = [self._key("bucket"), self._key("queue"), self._key("seen")]
+            args = [
+                waiter,
+                arrival,
+                settings.anthropic_rpm_limit,
+                settings.anthropic_tpm_limit,
+                tokens,
+                STALE_WAITER_MS,
+                BURST_SECONDS,
+            ]
+
+            acquired = False
+            try:
+                while True:
+                    wait_ms = await script(keys=keys, args=args, client=redis)
+                    if not wait_ms:
+                        acquired = True
+                        break
+                    waited = time.monotonic() - started
+                    if waited >= settings.anthropic_rate_limit_max_wait:
+                        self.stats.timeouts += 1
+                        raise TimeoutError(
+                            f"Waited {waited:.0f}s for the Anthropic rate limit"
+                        )
+                    await asyncio.sleep(min(wait_ms / 1000, MAX_POLL_SECONDS))
+            finally:
+                # Timed out, cancelled or failed: give up our place, or we
+                # would block the queue head until considered stale
+                if not acquired:
+                    await self._leave(redis, waiter)
+
+            waited = time.monotonic() - started
+            await self._record_wait(redis, waited)
+            return waited
+
+        except TimeoutError:
+            raise
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable, not throttling: {e}")
+            return 0.0
+
+    async def settle(self, estimated: int, actual: int) -> None:
+        """Return tokens reserved by ``acquire`` but not used."""
+        if not settings.anthropic_rate_limit_enabled or actual >= estimated:
+            return
+        try:
+            redis = redis_clients.get()
+            script = self._script("settle", SETTLE_SCRIPT, redis)
+            await script(
+                keys=[self._key("bucket")],
+                args=[
+                    settings.anthropic_tpm_limit * BURST_SECONDS / 60,
+                    estimated - actual,
+                ],
+                client=redis,
+            )
+        except Exception as e:
+            logger.warning(f"Rate limiter settle failed: {e}")
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Wait metrics summed over all processes, plus the current queue."""
+        redis = redis_clients.get()
+        metrics = await redis.hgetall(self._key("metrics"))
+        queued = await redis.zcard(self._key("queue"))
+        values = {key.decode(): float(value) for key, value in metrics.items()}
+        acquired = int(values.get("acquired", 0))
+        total_wait = values.get("total_wait", 0.0)
+        return {
+            "acquired": acquired,
+            "waited": int(values.get("waited", 0)),
+            "total_wait_seconds": round(total_wait, 3),
+            "average_wait_seconds": (
+                round(total_wait / acquired, 3) if acquired else 0.0
+            ),
+            "queued": queued,
+        }
+
+    async def _leave(self, redis: Any, waiter: str) -> None:
+        """Remove a waiter that did not acquire from the queue."""
+        try:
+            pipe = redis.pipeline(transaction=False)
+            pipe.zrem(self._key("queue"), waiter)
+            pipe.hdel(self._key("seen"), waiter)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not leave the rate limit queue: {e}")
+
+    async def _record_wait(self, redis: Any, waited: float) -> None:
+        """Update local and shared wait metrics."""
+        stats = self.stats
+        stats.acquired += 1
+        stats.total_wait += waited
+        stats.max_wait = max(stats.max_wait, waited)
+        slow = waited >= SLOW_WAIT_SECONDS
+        if slow:
+            stats.waited += 1
+            logger.info(
+                f"Waited {waited:.1f}s for the Anthropic rate limit "
+                f"(average {stats.average_wait:.2f}s over {stats.acquired} calls)"
+            )
+
+        key = self._key("metrics")
+        pipe = redis.pipeline(transaction=False)
+        pipe.hincrby(key, "acquired", 1)
+        pipe.hincrbyfloat(key, "total_wait", waited)
+        if slow:
+            pipe.hincrby(key, "waited", 1)
+        await pipe.execute()
+
+    def _script(self, name: str, source: str, redis: Any) -> Any:
+        """Registered Lua script; callable with any client via ``client=``."""
+        script = self._scripts.get(name)
+        if script is None:
+            script = self._scripts[name] = redis.register_script(source)
+        return script
+
+    def _key(self, part: str) -> str:
+        return f"rate_limit:{self.name}:{part}"
+
+
+def estimate_tokens(params: Dict[str, Any]) -> int:
+    """
+    Estimate the rate-limited tokens of a Messages API request.
+
+    Counts the user content and reserves ``max_tokens`` of output. Cached
+    system prompts are left out, since cache reads do not count towards
+    the input token limit.
+    """
+    tokens = params.get("max_tokens", 0)
+    for message in params.get("messages", []):
+        content = message.get("content")
+        blocks = (
+            [{"type": "text", "text": content}] if isinstance(content, str) else content
+        )
+        for block in blocks or []:
+            if block.get("type") == "image":
+                tokens += IMAGE_TOKENS
+            elif block.get("type") == "text":
+                tokens += len(block["text"]) // CHARS_PER_TOKEN
+    return tokens
+
+
+def usage_tokens(usage: Any) -> int:
+    """Rate-limited tokens of a response: uncached input, cache writes, output."""
+    return (
+        usage.input_tokens
+        + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+        + usage.output_tokens
+    )
+
+
+# Singleton instance
+anthropic_limiter = RateLimiter()
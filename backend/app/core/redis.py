@@ -0,0 +1,46 @@
+import asyncio
+import logging
+import weakref
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RedisRegistry:
+    """
+    Shared async Redis clients, one per event loop.
+
+    Like httpx clients, an asyncio Redis connection pool is bound to the
+    loop it connected on, and Celery tasks may run on more than one loop.
+    """
+
+    def __init__(self):
+        # event loop -> client; entries vanish with their loop
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def get(self) -> aioredis.Redis:
+        """Get the shared client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = aioredis.Redis.from_url(settings.redis_url)
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close the client of the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+            logger.info("Closed Redis client")
+
+    def reset(self) -> None:
+        """Forget all clients without closing them (e.g. after fork)."""
+        self._clients = weakref.WeakKeyDictionary()
+
+
+# Singleton instance
+redis_clients = RedisRegistry()
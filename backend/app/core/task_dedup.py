@@ -0,0 +1,303 @@
+import asyncio
+import contextlib
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from app.config import settings
+from app.core.redis import redis_clients
+
+logger = logging.getLogger(__name__)
+
+# Scopes reported by get_metrics even before any event
+SCOPES = ("analysis", "collect")
+METRIC_EVENTS = (
+    "claimed",
+    "duplicate_enqueues",
+    "acquired",
+    "duplicate_runs",
+    "leases_lost",
+)
+
+# Delete a lock only while it still holds our token
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Overwrite a marker only while it holds the expected value ('' = absent)
+REPLACE_SCRIPT = """
+if (redis.call('GET', KEYS[1]) or '') == ARGV[1] then
+    return redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+end
+return false
+"""
+
+# Extend a lock only while it still holds our token
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class TaskDedup:
+    """
+    Suppress duplicate analysis and collection tasks across processes.
+
+    Work is identified by a scope ("analysis", "collect") and a key within
+    it, e.g. ``image:<ad_id>``. Two kinds of Redis keys guard it:
+
+    - Queued markers, set with ``claim`` when a task is enqueued and removed
+      with ``clear`` when it finishes. A request for work whose marker
+      exists is not enqueued again. Markers expire after ``task_dedup_ttl``
+      in case their task never runs.
+    - In-flight locks, taken with ``hold`` while a worker does the work.
+      They are leases of ``task_lock_lease`` seconds, renewed while held,
+      so the locks of a killed worker free up quickly. Duplicates that
+      reach a worker anyway (retries, redelivery, other enqueue paths)
+      find the lock taken and skip the work.
+
+    Suppressed duplicates are counted in a Redis hash shared by all
+    processes. If Redis is unavailable, nothing is suppressed.
+    """
+
+    def __init__(self):
+        # name -> registered script
+        self._scripts: Dict[str, Any] = {}
+
+    async def claim(
+        self, scope: str, keys: Iterable[str], value: str = "1"
+    ) -> List[str]:
+        """
+        Set queued markers for work about to be enqueued.
+
+        Args:
+            scope: Work scope
+            keys: Work keys
+            value: Stored in the markers (see ``claimed_value``)
+
+        Returns:
+            Keys newly claimed; the others are queued already
+        """
+        keys = list(dict.fromkeys(keys))
+        if not settings.task_dedup_enabled or not keys:
+            return keys
+
+        try:
+            redis = redis_clients.get()
+            pipe = redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.set(
+                    self._key(scope, "queued", key),
+                    value,
+                    nx=True,
+                    ex=settings.task_dedup_ttl,
+                )
+            results = await pipe.execute()
+            claimed = [key for key, ok in zip(keys, results) if ok]
+            await self._count(
+                redis,
+                scope,
+                claimed=len(claimed),
+                duplicate_enqueues=len(keys) - len(claimed),
+            )
+            return claimed
+        except Exception as e:
+            logger.warning(f"Task dedup unavailable, not suppressing: {e}")
+            return keys
+
+    async def claimed_value(self, scope: str, key: str) -> Optional[str]:
+        """Value of the queued marker of a key, or None if not queued."""
+        try:
+            value = await redis_clients.get().get(self._key(scope, "queued", key))
+        except Exception as e:
+            logger.warning(f"Task dedup lookup failed: {e}")
+            return None
+        return value.decode() if value is not None else None
+
+    async def replace(
+        self, scope: str, key: str, value: str, expected: Optional[str]
+    ) -> bool:
+        """
+        Take over a queued marker whose work is no longer queued.
+
+        Args:
+            scope: Work scope
+            key: Work key
+            value: New marker value
+            expected: Value the marker must still hold (None: absent), so
+                concurrent takeovers of the same marker let only one win
+
+        Returns:
+            True if the marker now holds ``value``
+        """
+        if not settings.task_dedup_enabled:
+            return True
+        try:
+            redis = redis_clients.get()
+            script = self._script("replace", REPLACE_SCRIPT, redis)
+            replaced = await script(
+                keys=[self._key(scope, "queued", key)],
+                args=[expected or "", value, settings.task_dedup_ttl],
+                client=redis,
+            )
+        except Exception as e:
+            logger.warning(f"Replacing queued marker {scope}:{key} failed: {e}")
+            return False
+        return bool(replaced)
+
+    async def clear(self, scope: str, keys: Iterable[str]) -> None:
+        """Remove the queued markers of finished work."""
+        keys = list(keys)
+        if not settings.task_dedup_enabled or not keys:
+            return
+        try:
+            await redis_clients.get().delete(
+                *(self._key(scope, "queued", key) for key in keys)
+            )
+        except Exception as e:
+            logger.warning(f"Clearing queued markers failed: {e}")
+
+    @asynccontextmanager
+    async def hold(self, scope: str, keys: Iterable[str]) -> AsyncIterator[List[str]]:
+        """
+        Hold in-flight locks for the duration of a block.
+
+        Usage:
+            async with task_dedup.hold("analysis", [f"image:{ad_id}"]) as held:
+                if not held:
+                    return  # another worker is on it
+
+        Args:
+            scope: Work scope
+            keys: Work keys
+
+        Yields:
+            Keys locked; the others are being worked on elsewhere
+        """
+        keys = list(dict.fromkeys(keys))
+        if not settings.task_dedup_enabled or not keys:
+            yield keys
+            return
+
+        token = uuid.uuid4().hex
+        lease_ms = int(settings.task_lock_lease * 1000)
+        try:
+            redis = redis_clients.get()
+            pipe = redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.set(self._key(scope, "running", key), token, nx=True, px=lease_ms)
+            results = await pipe.execute()
+            held = [key for key, ok in zip(keys, results) if ok]
+            await self._count(
+                redis, scope, acquired=len(held), duplicate_runs=len(keys) - len(held)
+            )
+        except Exception as e:
+            logger.warning(f"Task dedup unavailable, not suppressing: {e}")
+            held = None
+
+        if held is None:
+            yield keys
+            return
+        if len(held) < len(keys):
+            logger.info(
+                f"Skipping {len(keys) - len(held)} {scope} tasks already in progress"
+            )
+
+        renewer = None
+        if held:
+            renewer = asyncio.create_task(
+                self._renew(redis, scope, list(held), token, lease_ms)
+            )
+        try:
+            yield held
+        finally:
+            if renewer is not None:
+                renewer.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await renewer
+            await self._release(redis, scope, held, token)
+
+    async def get_metrics(self) -> Dict[str, Dict[str, int]]:
+        """Counts of claims, locks and suppressed duplicates per scope."""
+        values = await redis_clients.get().hgetall(self._metrics_key())
+        metrics = {scope: dict.fromkeys(METRIC_EVENTS, 0) for scope in SCOPES}
+        for field, value in values.items():
+            scope, _, event = field.decode().partition(":")
+            counts = metrics.setdefault(scope, dict.fromkeys(METRIC_EVENTS, 0))
+            counts[event] = int(value)
+        return metrics
+
+    async def _renew(
+        self, redis: Any, scope: str, keys: List[str], token: str, lease_ms: int
+    ) -> None:
+        """Extend held leases every third of their length until cancelled."""
+        script = self._script("renew", RENEW_SCRIPT, redis)
+        while keys:
+            await asyncio.sleep(lease_ms / 3000)
+            for key in list(keys):
+                try:
+                    renewed = await script(
+                        keys=[self._key(scope, "running", key)],
+                        args=[token, lease_ms],
+                        client=redis,
+                    )
+                except Exception as e:
+                    logger.warning(f"Renewing lock {scope}:{key} failed: {e}")
+                    continue
+                if not renewed:
+                    # Expired while Redis was unreachable; someone may own it now
+                    logger.warning(f"Lost lock {scope}:{key} before finishing")
+                    keys.remove(key)
+                    await self._count(redis, scope, leases_lost=1)
+
+    async def _release(
+        self, redis: Any, scope: str, keys: List[str], token: str
+    ) -> None:
+        """Delete the locks that still hold our token."""
+        if not keys:
+            return
+        try:
+            script = self._script("release", RELEASE_SCRIPT, redis)
+            for key in keys:
+                await script(
+                    keys=[self._key(scope, "running", key)], args=[token], client=redis
+                )
+        except Exception as e:
+            # The leases expire on their own
+            logger.warning(f"Releasing {scope} locks failed: {e}")
+
+    async def _count(self, redis: Any, scope: str, **counts: int) -> None:
+        """Add to the shared metrics."""
+        counts = {event: count for event, count in counts.items() if count}
+        if not counts:
+            return
+        try:
+            pipe = redis.pipeline(transaction=False)
+            for event, count in counts.items():
+                pipe.hincrby(self._metrics_key(), f"{scope}:{event}", count)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Recording task dedup metrics failed: {e}")
+
+    def _script(self, name: str, source: str, redis: Any) -> Any:
+        """Registered Lua script; callable with any client via ``client=``."""
+        script = self._scripts.get(name)
+        if script is None:
+            script = self._scripts[name] = redis.register_script(source)
+        return script
+
+    def _key(self, scope: str, kind: str, key: str) -> str:
+        return f"task_dedup:{scope}:{kind}:{key}"
+
+    def _metrics_key(self) -> str:
+        return "task_dedup:metrics"
+
+
+# Singleton instance
+task_dedup = TaskDedup()
@@ -8,7 +8,10 @@ from fastapi.staticfiles import StaticFiles
 
 from app.api.v1.router import api_router
 from app.config import settings
+from app.core.claude import claude_client
 from app.core.database import close_db, init_db
+from app.core.http import http_clients
+from app.core.redis import redis_clients
 
 # Configure logging
 logging.basicConfig(
@@ -31,6 +34,9 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down...")
+    await http_clients.aclose()
+    await claude_client.aclose()
+    await redis_clients.aclose()
     await close_db()
     logger.info("Database connections closed")
 
@@ -1,3 +1,15 @@
-from app.models.ad import AdRaw, AdsAnalysisCopy, AdsAnalysisImage, CollectJob
+from app.models.ad import (
+    AdRaw,
+    AdsAnalysisCopy,
+    AdsAnalysisImage,
+    AnalysisBatchJob,
+    CollectJob,
+)
 
-__all__ = ["AdRaw", "AdsAnalysisImage", "AdsAnalysisCopy", "CollectJob"]
+__all__ = [
+    "AdRaw",
+    "AdsAnalysisImage",
+    "AdsAnalysisCopy",
+    "CollectJob",
+    "AnalysisBatchJob",
+]
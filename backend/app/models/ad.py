@@ -125,6 +125,8 @@ class AdsAnalysisImage(Base):
 
     # Raw response
     analysis_raw: Mapped[Optional[dict]] = mapped_column(JSON)
+    # Analysis cache key (prompt version + content); see AnalysisCache
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), index=True)
 
     # Timestamps
     analyzed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -179,6 +181,8 @@ class AdsAnalysisCopy(Base):
 
     # Raw response
     analysis_raw: Mapped[Optional[dict]] = mapped_column(JSON)
+    # Analysis cache key (prompt version + content); see AnalysisCache
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), index=True)
 
     # Timestamps
     analyzed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -261,6 +265,8 @@ class MonitoringKeyword(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     schedule_cron: Mapped[str] = mapped_column(String(50), default="0 9 * * *")
     last_run_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    # Start of the last successful run; incremental runs fetch from here
+    last_success_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     next_run_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
@@ -316,6 +322,8 @@ class CollectJob(Base):
     country: Mapped[str] = mapped_column(String(10), default="KR")
     target_count: Mapped[Optional[int]] = mapped_column(Integer)
     collected_count: Mapped[int] = mapped_column(Integer, default=0)
+    # Per-keyword resume points: {keyword: {"after": ..., "fetched": ...}}
+    checkpoint: Mapped[Optional[dict]] = mapped_column(JSON)
     error_message: Mapped[Optional[str]] = mapped_column(Text)
     started_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
@@ -327,3 +335,23 @@ class CollectJob(Base):
         if self.target_count is None or self.target_count == 0:
             return 0
         return min(100, int((self.collected_count / self.target_count) * 100))
+
+
+class AnalysisBatchJob(Base):
+    """Message Batches API submission tracking."""
+
+    __tablename__ = "analysis_batch_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    batch_id: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default="submitted")
+    types: Mapped[List[str]] = mapped_column(ARRAY(String), default=list)
+    ad_ids: Mapped[List[str]] = mapped_column(ARRAY(String), default=list)
+    request_count: Mapped[int] = mapped_column(Integer, default=0)
+    succeeded_count: Mapped[int] = mapped_column(Integer, default=0)
+    failed_count: Mapped[int] = mapped_column(Integer, default=0)
+    # custom_id -> analysis cache key of the submitted content
+    content_keys: Mapped[Optional[dict]] = mapped_column(JSON)
+    error_message: Mapped[Optional[str]] = mapped_column(Text)
+    submitted_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -115,11 +115,15 @@ class AnalysisQueueResponse(BaseModel):
 class AnalysisBatchRequest(BaseModel):
     """Request for batch analysis."""
 
-    ad_ids: List[str] = Field(..., max_length=50, description="Ad IDs to analyze")
+    ad_ids: List[str] = Field(..., max_length=1000, description="Ad IDs to analyze")
     types: List[str] = Field(
         default=["image", "copy"],
         description="Analysis types: image, copy",
     )
+    combined: Optional[bool] = Field(
+        default=None,
+        description="Analyze image and copy in one call (default: server setting)",
+    )
 
 
 class AnalysisBatchResponse(BaseModel):
@@ -128,3 +132,122 @@ class AnalysisBatchResponse(BaseModel):
     queued_count: int
     skipped_count: int
     message: str
+    task_id: Optional[str] = None
+
+
+class AdAnalysisResultSchema(BaseModel):
+    """Outcome of one ad in a batch."""
+
+    ad_id: str
+    success: bool
+    analyzed: List[str] = []
+    skipped: Dict[str, str] = {}
+    failed: Dict[str, str] = {}
+
+
+class AnalysisBatchStatusResponse(BaseModel):
+    """Progress and per-ad results of a batch analysis task."""
+
+    task_id: str
+    state: str
+    total: Optional[int] = None
+    processed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    results: List[AdAnalysisResultSchema] = []
+    error: Optional[str] = None
+
+
+# Bulk (Message Batches) Request/Response
+class AnalysisBulkRequest(BaseModel):
+    """Request for bulk analysis through the Message Batches API."""
+
+    ad_ids: List[str] = Field(..., max_length=10000, description="Ad IDs to analyze")
+    types: List[str] = Field(
+        default=["image", "copy"],
+        description="Analysis types: image, copy",
+    )
+
+
+# Backlog scan Request/Response
+class AnalysisBacklogRequest(BaseModel):
+    """Request to analyze every ad that still needs analysis."""
+
+    types: List[str] = Field(
+        default=["image", "copy"],
+        description="Analysis types: image, copy",
+    )
+    industry: Optional[str] = Field(default=None, description="Only this industry")
+    collected_from: Optional[datetime] = Field(
+        default=None, description="Only ads collected at or after this time"
+    )
+    collected_to: Optional[datetime] = Field(
+        default=None, description="Only ads collected before this time"
+    )
+    combined: Optional[bool] = Field(
+        default=None,
+        description="Analyze image and copy in one call (default: server setting)",
+    )
+
+
+class AnalysisBacklogResponse(BaseModel):
+    """Response when a backlog scan is queued."""
+
+    status: str = "queued"
+    message: str
+    task_id: str
+
+
+class AnalysisBatchJobResponse(BaseModel):
+    """Message batch job status."""
+
+    batch_id: str
+    status: str
+    types: List[str] = []
+    request_count: int
+    succeeded_count: int
+    failed_count: int
+    error_message: Optional[str] = None
+    submitted_at: datetime
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class RateLimitMetricsResponse(BaseModel):
+    """Anthropic rate limiter waits, summed over all processes."""
+
+    acquired: int
+    waited: int
+    total_wait_seconds: float
+    average_wait_seconds: float
+    queued: int
+
+
+class LaneMetricsResponse(BaseModel):
+    """Depth and queue wait of one Celery queue, over all workers."""
+
+    queue: str
+    depth: int = Field(description="Tasks waiting")
+    started: int = Field(description="Tasks started since metrics began")
+    average_wait_seconds: float
+    p50_wait_seconds: float = Field(description="Over the most recent tasks")
+    p95_wait_seconds: float = Field(description="Over the most recent tasks")
+
+
+class TaskDedupScopeMetrics(BaseModel):
+    """Duplicate suppression counts of one task scope."""
+
+    claimed: int = Field(description="Requests queued")
+    duplicate_enqueues: int = Field(description="Requests not queued as duplicates")
+    acquired: int = Field(description="In-flight locks taken by workers")
+    duplicate_runs: int = Field(description="Task runs skipped as duplicates")
+    leases_lost: int = Field(description="Locks that expired while still in use")
+
+
+class TaskDedupMetricsResponse(BaseModel):
+    """Duplicate suppression counts, summed over all processes."""
+
+    analysis: TaskDedupScopeMetrics
+    collect: TaskDedupScopeMetrics
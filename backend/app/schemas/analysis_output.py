@@ -0,0 +1,121 @@
+"""
+Structured Claude analysis output.
+
+These models mirror the ``AdsAnalysisImage`` and ``AdsAnalysisCopy``
+columns and the value sets the analysis prompts ask for. Their JSON schemas
+are sent as tool input schemas, and tool input is validated against them
+before anything is stored.
+"""
+
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field, StringConstraints
+from typing_extensions import Annotated
+
+HexColor = Annotated[str, StringConstraints(pattern=r"^#[0-9A-Fa-f]{6}$")]
+
+
+# Image Analysis
+class CompositionOutput(BaseModel):
+    """Image composition."""
+
+    has_person: bool
+    person_type: Optional[Literal["student", "teacher", "parent", "none"]] = None
+    text_ratio: int = Field(ge=0, le=100)
+    has_chart: bool
+    logo_position: Optional[
+        Literal[
+            "top_left", "top_right", "bottom_left", "bottom_right", "center", "none"
+        ]
+    ] = None
+
+
+class ColorsOutput(BaseModel):
+    """Image colors as HEX codes."""
+
+    primary: Optional[HexColor] = None
+    secondary: Optional[HexColor] = None
+    tertiary: Optional[HexColor] = None
+    tone: Optional[Literal["bright", "medium", "dark"]] = None
+    saturation: Optional[Literal["high", "medium", "low"]] = None
+
+
+class LayoutOutput(BaseModel):
+    """Image layout."""
+
+    type: Optional[
+        Literal["top_bottom_split", "left_right_split", "center_focus", "full_text"]
+    ] = None
+    atmosphere: Optional[Literal["serious", "energetic", "friendly", "premium"]] = None
+    emphasis_elements: List[str] = []
+
+
+class ImageAnalysisOutput(BaseModel):
+    """Image analysis result."""
+
+    composition: CompositionOutput
+    colors: ColorsOutput
+    layout: LayoutOutput
+    mentioned_regions: List[str] = []
+
+
+# Copy Analysis
+class StructureOutput(BaseModel):
+    """Copy structure."""
+
+    headline: Optional[str] = None
+    headline_length: Optional[int] = Field(default=None, ge=0)
+    body: Optional[str] = None
+    cta: Optional[str] = None
+    core_message: Optional[
+        Literal["achievement", "social_proof", "free_trial", "discount", "management"]
+    ] = None
+
+
+class NumberOutput(BaseModel):
+    """A number mentioned in the copy."""
+
+    value: float
+    unit: Optional[str] = None
+    context: Optional[str] = None
+
+
+class OfferOutput(BaseModel):
+    """Offer in the copy."""
+
+    discount_info: Optional[str] = Field(default=None, max_length=255)
+    free_benefit: Optional[str] = Field(default=None, max_length=255)
+    social_proof: Optional[str] = Field(default=None, max_length=255)
+    urgency: Optional[str] = Field(default=None, max_length=255)
+    differentiation: Optional[str] = None
+
+
+class ToneOutput(BaseModel):
+    """Copy tone."""
+
+    formality: Optional[Literal["formal", "informal", "medium"]] = None
+    emotion: Optional[Literal["rational", "emotional", "balanced"]] = None
+    style: Optional[Literal["challenging", "stable"]] = None
+
+
+class CopyAnalysisOutput(BaseModel):
+    """Copy analysis result."""
+
+    structure: StructureOutput
+    numbers: List[NumberOutput] = []
+    offer: OfferOutput
+    tone: ToneOutput
+    target_audience: Optional[str] = Field(default=None, max_length=50)
+    keywords: List[str] = []
+    regions: List[str] = []
+
+
+class CombinedAnalysisOutput(BaseModel):
+    """Image and copy analysis of one ad."""
+
+    image: ImageAnalysisOutput
+    # "copy" would shadow BaseModel.copy
+    copy_: CopyAnalysisOutput = Field(alias="copy")
+
+    class Config:
+        populate_by_name = True
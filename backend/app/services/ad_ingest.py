@@ -0,0 +1,221 @@
+"""Bulk ingestion of collected ads into ads_raw."""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import literal_column, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.ad import AdRaw
+
+logger = logging.getLogger(__name__)
+
+# Columns written on ingest; ``id`` comes from the sequence
+INGEST_COLUMNS = [
+    "ad_id",
+    "page_id",
+    "page_name",
+    "ad_creative_body",
+    "ad_creative_link_title",
+    "ad_creative_link_description",
+    "ad_snapshot_url",
+    "start_date",
+    "stop_date",
+    "platforms",
+    "currency",
+    "spend_lower",
+    "spend_upper",
+    "impressions_lower",
+    "impressions_upper",
+    "target_country",
+    "industry",
+    "image_url",
+    "image_s3_path",
+    "collected_at",
+    "created_at",
+    "updated_at",
+]
+
+# Columns refreshed from the API when an existing ad is re-ingested
+UPDATE_COLUMNS = [
+    "page_name",
+    "ad_creative_body",
+    "ad_creative_link_title",
+    "ad_creative_link_description",
+    "ad_snapshot_url",
+    "stop_date",
+    "platforms",
+    "spend_lower",
+    "spend_upper",
+    "impressions_lower",
+    "impressions_upper",
+    "collected_at",
+]
+
+
+@dataclass
+class IngestResult:
+    """Outcome of a bulk ingest."""
+
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+
+    def __iadd__(self, other: "IngestResult") -> "IngestResult":
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.skipped += other.skipped
+        return self
+
+
+def _to_int(val: Any) -> Optional[int]:
+    """Convert to int safely."""
+    if val is None:
+        return None
+    try:
+        return int(val)
+    except (ValueError, TypeError):
+        return None
+
+
+def build_ad_row(
+    ad_data: Dict[str, Any],
+    industry: str,
+    country: str = "KR",
+    image_s3_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Build an ads_raw row from a parsed collector ad.
+
+    Every ingested column is set explicitly, since the COPY path bypasses
+    the model's Python-side defaults.
+    """
+    now = datetime.utcnow()
+    return {
+        "ad_id": ad_data["ad_id"],
+        "page_id": ad_data.get("page_id"),
+        "page_name": ad_data.get("page_name"),
+        "ad_creative_body": ad_data.get("ad_creative_body"),
+        "ad_creative_link_title": ad_data.get("ad_creative_link_title"),
+        "ad_creative_link_description": ad_data.get("ad_creative_link_description"),
+        "ad_snapshot_url": ad_data.get("ad_snapshot_url"),
+        "start_date": ad_data.get("start_date"),
+        "stop_date": ad_data.get("stop_date"),
+        "platforms": ad_data.get("platforms") or [],
+        "currency": ad_data.get("currency"),
+        "spend_lower": _to_int(ad_data.get("spend_lower")),
+        "spend_upper": _to_int(ad_data.get("spend_upper")),
+        "impressions_lower": _to_int(ad_data.get("impressions_lower")),
+        "impressions_upper": _to_int(ad_data.get("impressions_upper")),
+        "target_country": country,
+        "industry": industry,
+        "image_url": ad_data.get("image_url"),
+        "image_s3_path": image_s3_path,
+        "collected_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+async def bulk_insert_ads(
+    db: AsyncSession,
+    rows: List[Dict[str, Any]],
+    update_existing: bool = False,
+) -> IngestResult:
+    """
+    Insert ads_raw rows in one statement, resolving ``ad_id`` conflicts.
+
+    Existing ads are skipped, or refreshed with the new API values when
+    ``update_existing`` is set. Batches of ``ingest_copy_threshold`` rows
+    or more are streamed with COPY instead (insert-only).
+
+    Args:
+        db: Database session (the caller commits)
+        rows: Rows from ``build_ad_row``
+        update_existing: Update existing ads instead of skipping them
+
+    Returns:
+        Counts of inserted, updated and skipped rows
+    """
+    if not rows:
+        return IngestResult()
+
+    # A statement may not touch the same row twice; keep the last copy
+    unique_rows = list({row["ad_id"]: row for row in rows}.values())
+    duplicates = len(rows) - len(unique_rows)
+
+    if not update_existing and len(unique_rows) >= settings.ingest_copy_threshold:
+        result = await _copy_insert_ads(db, unique_rows)
+    else:
+        result = await _upsert_ads(db, unique_rows, update_existing)
+
+    result.skipped += duplicates
+    return result
+
+
+async def _upsert_ads(
+    db: AsyncSession,
+    rows: List[Dict[str, Any]],
+    update_existing: bool,
+) -> IngestResult:
+    """INSERT ... ON CONFLICT (ad_id) DO NOTHING / DO UPDATE."""
+    stmt = pg_insert(AdRaw).values(rows)
+    if update_existing:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AdRaw.ad_id],
+            set_={
+                **{column: stmt.excluded[column] for column in UPDATE_COLUMNS},
+                "updated_at": datetime.utcnow(),
+            },
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[AdRaw.ad_id])
+
+    # xmax is 0 only for rows this statement inserted
+    stmt = stmt.returning(literal_column("xmax = 0").label("inserted"))
+    flags = (await db.execute(stmt)).scalars().all()
+
+    inserted = sum(1 for flag in flags if flag)
+    return IngestResult(
+        inserted=inserted,
+        updated=len(flags) - inserted,
+        skipped=len(rows) - len(flags),
+    )
+
+
+async def _copy_insert_ads(
+    db: AsyncSession, rows: List[Dict[str, Any]]
+) -> IngestResult:
+    """COPY rows into a temp table, then move new ones into ads_raw."""
+    conn = await db.connection()
+    await conn.execute(
+        text(
+            "CREATE TEMP TABLE IF NOT EXISTS ads_raw_staging "
+            "(LIKE ads_raw INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+    )
+
+    raw_conn = await conn.get_raw_connection()
+    await raw_conn.driver_connection.copy_records_to_table(
+        "ads_raw_staging",
+        records=[tuple(row[column] for column in INGEST_COLUMNS) for row in rows],
+        columns=INGEST_COLUMNS,
+    )
+
+    columns = ", ".join(INGEST_COLUMNS)
+    result = await conn.execute(
+        text(
+            f"INSERT INTO ads_raw ({columns}) "
+            f"SELECT {columns} FROM ads_raw_staging "
+            "ON CONFLICT (ad_id) DO NOTHING"
+        )
+    )
+    await conn.execute(text("TRUNCATE ads_raw_staging"))
+
+    inserted = result.rowcount
+    logger.info(f"Copied {len(rows)} ads, {inserted} new")
+    return IngestResult(inserted=inserted, skipped=len(rows) - inserted)
@@ -0,0 +1,171 @@
+"""Content-addressed cache of Claude analysis results."""
+
+import hashlib
+import json
+import logging
+import unicodedata
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.claude import claude_client
+from app.core.database import async_session_maker
+from app.core.redis import redis_clients
+from app.models.ad import AdsAnalysisCopy, AdsAnalysisImage
+
+logger = logging.getLogger(__name__)
+
+# Analysis type -> table whose content_hash column backs the cache
+CACHE_MODELS = {
+    "image": AdsAnalysisImage,
+    "copy": AdsAnalysisCopy,
+}
+
+
+def _normalize_text(text: Optional[str]) -> str:
+    """Normalize copy text so trivially different copies share a key."""
+    if not text:
+        return ""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class AnalysisCache:
+    """
+    Cache of analysis results keyed by content, not by ad.
+
+    The key hashes the prompt version with the normalized copy text or the
+    raw image bytes, so identical creatives served under different ad IDs
+    share one Claude call, and changing a prompt invalidates old entries.
+
+    Results live in Redis with a TTL. Every stored analysis row also keeps
+    its key in ``content_hash``, which serves as the durable fallback when
+    Redis misses or is unavailable.
+    """
+
+    def copy_key(self, body: Optional[str], title: Optional[str]) -> str:
+        """Cache key for ad copy."""
+        content = f"{_normalize_text(body)}\x1f{_normalize_text(title)}"
+        return self._key(claude_client.copy_prompt_version, content.encode())
+
+    def image_key(self, image_data: bytes) -> str:
+        """Cache key for image bytes."""
+        return self._key(claude_client.image_prompt_version, image_data)
+
+    async def get(
+        self, kind: str, key: str, db: Optional[AsyncSession] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result.
+
+        Args:
+            kind: Analysis type ("image", "copy")
+            key: Key from ``image_key`` or ``copy_key``
+            db: Session for the database fallback; a short-lived one is
+                opened when omitted
+
+        Returns:
+            Analysis result or None on a miss
+        """
+        if not settings.analysis_cache_enabled:
+            return None
+
+        try:
+            cached = await redis_clients.get().get(self._redis_key(kind, key))
+            if cached is not None:
+                logger.debug(f"Analysis cache hit ({kind}, redis): {key}")
+                return json.loads(cached)
+        except Exception as e:
+            logger.warning(f"Analysis cache lookup failed: {e}")
+
+        result = await self._get_stored(kind, key, db)
+        if result is not None:
+            logger.debug(f"Analysis cache hit ({kind}, db): {key}")
+            await self.put(kind, key, result)
+        return result
+
+    async def get_many(
+        self, kind: str, keys: Iterable[str], db: AsyncSession
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up many keys with one Redis and at most one database round trip.
+
+        Returns:
+            Results of the keys that hit
+        """
+        keys = list(dict.fromkeys(keys))
+        if not settings.analysis_cache_enabled or not keys:
+            return {}
+
+        found: Dict[str, Dict[str, Any]] = {}
+        try:
+            cached = await redis_clients.get().mget(
+                [self._redis_key(kind, key) for key in keys]
+            )
+            found = {
+                key: json.loads(value)
+                for key, value in zip(keys, cached)
+                if value is not None
+            }
+        except Exception as e:
+            logger.warning(f"Analysis cache lookup failed: {e}")
+
+        missing = [key for key in keys if key not in found]
+        if missing:
+            model = CACHE_MODELS[kind]
+            rows = await db.execute(
+                select(model.content_hash, model.analysis_raw).where(
+                    model.content_hash.in_(missing), model.analysis_raw.is_not(None)
+                )
+            )
+            stored = {key: result for key, result in rows.all()}
+            for key, result in stored.items():
+                await self.put(kind, key, result)
+            found.update(stored)
+
+        logger.info(f"Analysis cache: {len(found)}/{len(keys)} {kind} hits")
+        return found
+
+    async def put(self, kind: str, key: str, result: Dict[str, Any]) -> None:
+        """Store a result in Redis; the database copy is the analysis row."""
+        if not settings.analysis_cache_enabled:
+            return
+
+        try:
+            await redis_clients.get().set(
+                self._redis_key(kind, key),
+                json.dumps(result, ensure_ascii=False),
+                ex=settings.analysis_cache_ttl,
+            )
+        except Exception as e:
+            logger.warning(f"Analysis cache store failed: {e}")
+
+    async def _get_stored(
+        self, kind: str, key: str, db: Optional[AsyncSession]
+    ) -> Optional[Dict[str, Any]]:
+        """Find the result of an analysis row with the same content."""
+        model = CACHE_MODELS[kind]
+        stmt = (
+            select(model.analysis_raw)
+            .where(model.content_hash == key, model.analysis_raw.is_not(None))
+            .limit(1)
+        )
+
+        if db is not None:
+            return (await db.execute(stmt)).scalar_one_or_none()
+        async with async_session_maker() as session:
+            return (await session.execute(stmt)).scalar_one_or_none()
+
+    def _key(self, prompt_version: str, content: bytes) -> str:
+        digest = hashlib.sha256(prompt_version.encode())
+        digest.update(b"\x00")
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _redis_key(self, kind: str, key: str) -> str:
+        return f"analysis_cache:{kind}:{key}"
+
+
+# Singleton instance
+analysis_cache = AnalysisCache()
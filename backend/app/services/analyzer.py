@@ -1,15 +1,41 @@
+import asyncio
 import logging
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import and_, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
 
+from app.config import settings
 from app.core.claude import claude_client
-from app.models.ad import AdRaw, AdsAnalysisCopy, AdsAnalysisImage
+from app.models.ad import AdRaw, AdsAnalysisCopy, AdsAnalysisImage, AnalysisBatchJob
+from app.services.analysis_cache import analysis_cache
+from app.services.image_store import image_store
 
 logger = logging.getLogger(__name__)
 
+# Analysis type -> result table
+ANALYSIS_MODELS = {
+    "image": AdsAnalysisImage,
+    "copy": AdsAnalysisCopy,
+}
+
+# Rows per INSERT statement, well below the bind parameter limit
+INSERT_CHUNK = 500
+
+
+def _custom_id(analysis_type: str, ad_id: str) -> str:
+    """Batch request ID carrying the analysis type and ad ID."""
+    return f"{analysis_type}-{ad_id}"
+
+
+def _parse_custom_id(custom_id: str) -> Tuple[str, str]:
+    """Split a batch request ID into analysis type and ad ID."""
+    analysis_type, _, ad_id = custom_id.partition("-")
+    return analysis_type, ad_id
+
 
 class AdAnalyzer:
     """Service for analyzing ads using Claude AI."""
@@ -35,37 +61,74 @@ class AdAnalyzer:
             logger.error(f"Ad not found: {ad_id}")
             return None
 
-        if not ad.image_url and not ad.ad_snapshot_url:
-            logger.error(f"No image URL for ad: {ad_id}")
+        if not self.has_image(ad):
+            logger.error(f"No image for ad: {ad_id}")
             return None
 
-        image_url = ad.image_url or ad.ad_snapshot_url
-
-        # Check if already analyzed
-        existing = await db.execute(
-            select(AdsAnalysisImage).where(AdsAnalysisImage.ad_id == ad_id)
-        )
-        if existing.scalar_one_or_none():
+        # Check if already analyzed (loaded with the ad)
+        if ad.has_image_analysis:
             logger.info(f"Image analysis already exists for ad: {ad_id}")
             return None
 
-        # Call Claude API
-        analysis_result = await claude_client.analyze_image(image_url)
-
-        if not analysis_result:
-            logger.error(f"Failed to analyze image for ad: {ad_id}")
+        analysis = await self.build_image_analysis(ad, db)
+        if not analysis:
             return None
 
-        # Create analysis record
-        analysis = self._create_image_analysis(ad_id, analysis_result)
-
         db.add(analysis)
         await db.commit()
-        await db.refresh(analysis)
 
         logger.info(f"Image analysis completed for ad: {ad_id}")
         return analysis
 
+    async def analyze_ad(
+        self, db: AsyncSession, ad_id: str
+    ) -> Tuple[Optional[AdsAnalysisImage], Optional[AdsAnalysisCopy]]:
+        """
+        Analyze image and copy of an ad with one combined Claude call.
+
+        Analyses that already exist, or lack an image or copy, are skipped;
+        with only one left this is a regular single analysis.
+
+        Args:
+            db: Database session
+            ad_id: Ad ID to analyze
+
+        Returns:
+            New image and copy analysis records (None where not created)
+        """
+        result = await db.execute(select(AdRaw).where(AdRaw.ad_id == ad_id))
+        ad = result.scalar_one_or_none()
+
+        if not ad:
+            logger.error(f"Ad not found: {ad_id}")
+            return None, None
+
+        needs_image = self.has_image(ad) and not ad.has_image_analysis
+        needs_copy = self.has_copy(ad) and not ad.has_copy_analysis
+
+        image_analysis = copy_analysis = None
+        if needs_image and needs_copy:
+            image_analysis, copy_analysis = await self.build_combined_analysis(ad, db)
+        elif needs_image:
+            image_analysis = await self.build_image_analysis(ad, db)
+        elif needs_copy:
+            copy_analysis = await self.build_copy_analysis(ad, db)
+        else:
+            logger.info(f"Nothing left to analyze for ad: {ad_id}")
+            return None, None
+
+        records = [r for r in (image_analysis, copy_analysis) if r is not None]
+        if records:
+            db.add_all(records)
+            await db.commit()
+
+        logger.info(
+            f"Analysis completed for ad {ad_id}: "
+            f"image={'ok' if image_analysis else 'none'}, "
+            f"copy={'ok' if copy_analysis else 'none'}"
+        )
+        return image_analysis, copy_analysis
+
     async def analyze_copy(
         self, db: AsyncSession, ad_id: str
     ) -> Optional[AdsAnalysisCopy]:
@@ -87,40 +150,510 @@ class AdAnalyzer:
             logger.error(f"Ad not found: {ad_id}")
             return None
 
-        if not ad.ad_creative_body and not ad.ad_creative_link_title:
+        if not self.has_copy(ad):
             logger.error(f"No copy text for ad: {ad_id}")
             return None
 
-        # Check if already analyzed
-        existing = await db.execute(
-            select(AdsAnalysisCopy).where(AdsAnalysisCopy.ad_id == ad_id)
-        )
-        if existing.scalar_one_or_none():
+        # Check if already analyzed (loaded with the ad)
+        if ad.has_copy_analysis:
             logger.info(f"Copy analysis already exists for ad: {ad_id}")
             return None
 
-        # Call Claude API
-        analysis_result = await claude_client.analyze_copy(
-            body=ad.ad_creative_body,
-            title=ad.ad_creative_link_title,
-        )
-
-        if not analysis_result:
-            logger.error(f"Failed to analyze copy for ad: {ad_id}")
+        analysis = await self.build_copy_analysis(ad, db)
+        if not analysis:
             return None
 
-        # Create analysis record
-        analysis = self._create_copy_analysis(ad_id, analysis_result)
-
         db.add(analysis)
         await db.commit()
-        await db.refresh(analysis)
 
         logger.info(f"Copy analysis completed for ad: {ad_id}")
         return analysis
 
+    async def submit_bulk(
+        self, db: AsyncSession, ad_ids: List[str], types: List[str]
+    ) -> Optional[AnalysisBatchJob]:
+        """
+        Submit analyses for many ads as one message batch.
+
+        Ads that already have an analysis, or have no image or copy to
+        analyze, are left out. Results are stored by ``collect_bulk`` once
+        the batch has ended.
+
+        Args:
+            db: Database session
+            ad_ids: Ad IDs to analyze
+            types: Analysis types ("image", "copy")
+
+        Returns:
+            Batch job record or None if there was nothing to submit
+        """
+        targets = await self.load_targets(db, ad_ids)
+        found_ids = list(targets)
+
+        # "<type>-<ad_id>" -> cache key, and the content to send per key
+        content_keys: Dict[str, str] = {}
+        contents: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # Image requests are built after the cache lookup, so only images
+        # that are actually sent get normalized
+        images: Dict[str, bytes] = {}
+
+        if "copy" in types:
+            for ad, done in targets.values():
+                if "copy" in done or not self.has_copy(ad):
+                    continue
+                key = analysis_cache.copy_key(
+                    ad.ad_creative_body, ad.ad_creative_link_title
+                )
+                content_keys[_custom_id("copy", ad.ad_id)] = key
+                contents.setdefault(
+                    ("copy", key),
+                    claude_client.copy_request(
+                        ad.ad_creative_body, ad.ad_creative_link_title
+                    ),
+                )
+
+        if "image" in types:
+            image_ads = [
+                ad
+                for ad, done in targets.values()
+                if "image" not in done and self.has_image(ad)
+            ]
+            for ad_id, image_data in (await self._load_images(image_ads)).items():
+                key = analysis_cache.image_key(image_data)
+                content_keys[_custom_id("image", ad_id)] = key
+                images.setdefault(key, image_data)
+
+        cached = {
+            "image": await analysis_cache.get_many("image", images, db),
+            "copy": await analysis_cache.get_many(
+                "copy", [key for _, key in contents], db
+            ),
+        }
+        for key, image_data in images.items():
+            if key in cached["image"]:
+                continue
+            try:
+                contents[("image", key)] = claude_client.image_request(
+                    *await claude_client.prepare_image(image_data)
+                )
+            except ValueError as e:
+                logger.error(f"Skipping invalid image {key}: {e}")
+
+        # Store cache hits right away; send one request per distinct content
+        records = self._build_records(content_keys, cached)
+        pending = {
+            custom_id: key
+            for custom_id, key in content_keys.items()
+            if (_parse_custom_id(custom_id)[0], key) in contents
+            and key not in cached[_parse_custom_id(custom_id)[0]]
+        }
+        request_ids: Dict[Tuple[str, str], str] = {}
+        for custom_id, key in pending.items():
+            request_ids.setdefault((_parse_custom_id(custom_id)[0], key), custom_id)
+        requests = [
+            {"custom_id": custom_id, "params": contents[content]}
+            for content, custom_id in request_ids.items()
+        ]
+
+        if records:
+            stored = await self.store_analyses(db, records)
+            await db.commit()
+            logger.info(f"Stored {len(stored)} analyses from the analysis cache")
+
+        if not requests:
+            logger.info("No analyses to submit")
+            return None
+
+        batch_id = await claude_client.create_batch(requests)
+        job = AnalysisBatchJob(
+            batch_id=batch_id,
+            types=types,
+            ad_ids=found_ids,
+            request_count=len(requests),
+            content_keys=pending,
+        )
+        db.add(job)
+        await db.commit()
+
+        logger.info(f"Submitted {len(requests)} analyses as batch {batch_id}")
+        return job
+
+    async def collect_bulk(self, db: AsyncSession, job: AnalysisBatchJob) -> bool:
+        """
+        Store the results of a submitted message batch.
+
+        Each result is stored for every ad of the job with the same content.
+
+        Args:
+            db: Database session
+            job: Batch job from ``submit_bulk``
+
+        Returns:
+            False while the batch is still processing, True once stored
+        """
+        batch = await claude_client.get_batch(job.batch_id)
+        if batch.processing_status != "ended":
+            return False
+
+        content_keys = job.content_keys or {}
+        results: Dict[str, Dict[str, Dict[str, Any]]] = {"image": {}, "copy": {}}
+        failed = 0
+        async for custom_id, result in claude_client.iter_batch_results(job.batch_id):
+            kind, _ = _parse_custom_id(custom_id)
+            key = content_keys.get(custom_id)
+            if kind not in results or key is None or not result:
+                failed += 1
+                continue
+            results[kind][key] = result
+            await analysis_cache.put(kind, key, result)
+
+        # Ads analyzed elsewhere while the batch was running are skipped
+        records = self._build_records(content_keys, results)
+        stored = await self.store_analyses(db, records)
+
+        job.status = "completed"
+        job.succeeded_count = len(stored)
+        job.failed_count = failed
+        job.completed_at = datetime.utcnow()
+        await db.commit()
+
+        logger.info(
+            f"Stored {len(stored)} analyses from batch {job.batch_id}, "
+            f"{failed} requests failed"
+        )
+        return True
+
+    async def scan_pending(
+        self,
+        db: AsyncSession,
+        types: List[str],
+        after_id: int = 0,
+        limit: int = 1000,
+        industry: Optional[str] = None,
+        collected_from: Optional[datetime] = None,
+        collected_to: Optional[datetime] = None,
+    ) -> List[Tuple[int, str]]:
+        """
+        Find ads that still need one of ``types``, one keyset page at a time.
+
+        A single anti-join (``NOT EXISTS`` per analysis table) selects ads
+        that have an image or copy to analyze but no analysis of that type,
+        ordered by primary key. Pass the last returned row ID as
+        ``after_id`` to get the next page.
+
+        Args:
+            db: Database session
+            types: Analysis types ("image", "copy")
+            after_id: Only ads with a larger ``AdRaw.id``
+            limit: Page size
+            industry: Only ads of this industry
+            collected_from: Only ads collected at or after this time
+            collected_to: Only ads collected before this time
+
+        Returns:
+            ``(AdRaw.id, ad_id)`` pairs in ID order
+        """
+        missing = []
+        for kind in ANALYSIS_MODELS:
+            if kind not in types:
+                continue
+            model = ANALYSIS_MODELS[kind]
+            analyzed = select(model.id).where(model.ad_id == AdRaw.ad_id).exists()
+            has_content = (
+                self._has_image_clause() if kind == "image" else self._has_copy_clause()
+            )
+            missing.append(and_(has_content, ~analyzed))
+        if not missing:
+            return []
+
+        stmt = (
+            select(AdRaw.id, AdRaw.ad_id)
+            .where(AdRaw.id > after_id, or_(*missing))
+            .order_by(AdRaw.id)
+            .limit(limit)
+        )
+        if industry:
+            stmt = stmt.where(AdRaw.industry == industry)
+        if collected_from:
+            stmt = stmt.where(AdRaw.collected_at >= collected_from)
+        if collected_to:
+            stmt = stmt.where(AdRaw.collected_at < collected_to)
+
+        result = await db.execute(stmt)
+        return [(row_id, ad_id) for row_id, ad_id in result.all()]
+
+    def _has_image_clause(self) -> Any:
+        """SQL counterpart of ``has_image``; ``!= ''`` is never true for NULL."""
+        return or_(
+            AdRaw.image_s3_path != "",
+            AdRaw.image_url != "",
+            AdRaw.ad_snapshot_url != "",
+        )
+
+    def _has_copy_clause(self) -> Any:
+        """SQL counterpart of ``has_copy``; ``!= ''`` is never true for NULL."""
+        return or_(AdRaw.ad_creative_body != "", AdRaw.ad_creative_link_title != "")
+
+    async def load_targets(
+        self, db: AsyncSession, ad_ids: List[str]
+    ) -> Dict[str, Tuple[AdRaw, Set[str]]]:
+        """
+        Load ads and the analysis types they already have, in one query.
+
+        Existing analyses are outer-joined by ID only; the ads' eagerly
+        loaded relationships are not fetched.
+
+        Args:
+            db: Database session
+            ad_ids: Ad IDs to load
+
+        Returns:
+            Ad ID -> ad and its analyzed types, for the ads that exist
+        """
+        if not ad_ids:
+            return {}
+
+        stmt = (
+            select(AdRaw, AdsAnalysisImage.id, AdsAnalysisCopy.id)
+            .outerjoin(AdsAnalysisImage, AdsAnalysisImage.ad_id == AdRaw.ad_id)
+            .outerjoin(AdsAnalysisCopy, AdsAnalysisCopy.ad_id == AdRaw.ad_id)
+            .where(AdRaw.ad_id.in_(set(ad_ids)))
+            .options(noload("*"))
+        )
+        targets = {}
+        for ad, image_id, copy_id in (await db.execute(stmt)).all():
+            done = {
+                kind
+                for kind, analysis_id in (("image", image_id), ("copy", copy_id))
+                if analysis_id is not None
+            }
+            targets[ad.ad_id] = (ad, done)
+        return targets
+
+    async def store_analyses(
+        self, db: AsyncSession, records: List[Any]
+    ) -> Set[Tuple[str, str]]:
+        """
+        Insert analysis records in bulk, skipping ads that already have one.
+
+        Uses one ``INSERT ... ON CONFLICT (ad_id) DO NOTHING`` per table
+        (and chunk). The caller commits.
+
+        Args:
+            db: Database session
+            records: Unsaved ``AdsAnalysisImage``/``AdsAnalysisCopy`` records
+
+        Returns:
+            ``(analysis type, ad ID)`` of the rows inserted
+        """
+        stored: Set[Tuple[str, str]] = set()
+        for kind, model in ANALYSIS_MODELS.items():
+            # A statement may not touch the same row twice; keep the first
+            by_ad: Dict[str, Dict[str, Any]] = {}
+            for record in records:
+                if isinstance(record, model) and record.ad_id not in by_ad:
+                    by_ad[record.ad_id] = self._record_row(record)
+            rows = list(by_ad.values())
+            for start in range(0, len(rows), INSERT_CHUNK):
+                stmt = (
+                    pg_insert(model)
+                    .values(rows[start : start + INSERT_CHUNK])
+                    .on_conflict_do_nothing(index_elements=[model.ad_id])
+                    .returning(model.ad_id)
+                )
+                inserted = (await db.execute(stmt)).scalars().all()
+                stored.update((kind, ad_id) for ad_id in inserted)
+        return stored
+
+    def _record_row(self, record: Any) -> Dict[str, Any]:
+        """Column values of an unsaved record; ``id`` comes from the sequence."""
+        row = {}
+        for column in record.__table__.columns:
+            if column.key == "id":
+                continue
+            value = getattr(record, column.key)
+            # Unset columns get their Python-side default, as an ORM insert would
+            default = column.default
+            if value is None and default is not None:
+                value = default.arg(None) if default.is_callable else default.arg
+            row[column.key] = value
+        return row
+
+    def _build_records(
+        self,
+        content_keys: Dict[str, str],
+        results: Dict[str, Dict[str, Dict[str, Any]]],
+    ) -> List[Any]:
+        """
+        Build records for ``"<type>-<ad_id>"`` entries whose key has a result.
+
+        Args:
+            content_keys: Entry -> cache key
+            results: Analysis type -> cache key -> result
+        """
+        builders = {
+            "image": self._create_image_analysis,
+            "copy": self._create_copy_analysis,
+        }
+        records = []
+        for custom_id, key in content_keys.items():
+            kind, ad_id = _parse_custom_id(custom_id)
+            result = results.get(kind, {}).get(key)
+            if result is not None:
+                records.append(builders[kind](ad_id, result, key))
+        return records
+
+    async def _load_images(self, ads: List[AdRaw]) -> Dict[str, bytes]:
+        """Load ad images concurrently; unavailable images are left out."""
+        semaphore = asyncio.Semaphore(settings.snapshot_download_workers)
+
+        async def download(ad: AdRaw) -> Optional[bytes]:
+            async with semaphore:
+                try:
+                    return await image_store.load(ad)
+                except Exception as e:
+                    logger.error(f"Error loading image for ad {ad.ad_id}: {e}")
+                    return None
+
+        images = await asyncio.gather(*(download(ad) for ad in ads))
+        return {ad.ad_id: image for ad, image in zip(ads, images) if image}
+
+    def has_image(self, ad: AdRaw) -> bool:
+        """Whether the ad has an image to analyze."""
+        return bool(ad.image_s3_path or ad.image_url or ad.ad_snapshot_url)
+
+    def has_copy(self, ad: AdRaw) -> bool:
+        """Whether the ad has copy text to analyze."""
+        return bool(ad.ad_creative_body or ad.ad_creative_link_title)
+
+    async def build_image_analysis(
+        self, ad: AdRaw, db: Optional[AsyncSession] = None
+    ) -> Optional[AdsAnalysisImage]:
+        """
+        Analyze the ad image and build an unsaved analysis record.
+
+        The analysis cache is consulted first, so an image seen before under
+        another ad is not sent to Claude again. The database is only read
+        for the cache lookup, through ``db`` or a short-lived session of its
+        own, so calls for several ads can run concurrently.
+
+        Args:
+            ad: Ad with an image (see ``has_image``)
+            db: Optional session for the cache lookup
+
+        Returns:
+            Analysis record or None if the analysis failed
+        """
+        try:
+            image_data = await image_store.load(ad)
+        except Exception as e:
+            logger.error(f"Error loading image for ad {ad.ad_id}: {e}")
+            return None
+
+        key = analysis_cache.image_key(image_data)
+        analysis_result = await analysis_cache.get("image", key, db)
+
+        if analysis_result is None:
+            analysis_result = await claude_client.analyze_image_data(image_data)
+            if not analysis_result:
+                logger.error(f"Failed to analyze image for ad: {ad.ad_id}")
+                return None
+            await analysis_cache.put("image", key, analysis_result)
+
+        return self._create_image_analysis(ad.ad_id, analysis_result, key)
+
+    async def build_copy_analysis(
+        self, ad: AdRaw, db: Optional[AsyncSession] = None
+    ) -> Optional[AdsAnalysisCopy]:
+        """
+        Analyze the ad copy and build an unsaved analysis record.
+
+        Args:
+            ad: Ad with copy text (see ``has_copy``)
+            db: Optional session for the cache lookup
+
+        Returns:
+            Analysis record or None if the analysis failed
+        """
+        key = analysis_cache.copy_key(ad.ad_creative_body, ad.ad_creative_link_title)
+        analysis_result = await analysis_cache.get("copy", key, db)
+
+        if analysis_result is None:
+            analysis_result = await claude_client.analyze_copy(
+                body=ad.ad_creative_body,
+                title=ad.ad_creative_link_title,
+            )
+            if not analysis_result:
+                logger.error(f"Failed to analyze copy for ad: {ad.ad_id}")
+                return None
+            await analysis_cache.put("copy", key, analysis_result)
+
+        return self._create_copy_analysis(ad.ad_id, analysis_result, key)
+
+    async def build_combined_analysis(
+        self, ad: AdRaw, db: Optional[AsyncSession] = None
+    ) -> Tuple[Optional[AdsAnalysisImage], Optional[AdsAnalysisCopy]]:
+        """
+        Analyze image and copy in one Claude call and build both records.
+
+        Falls back to a separate call for a part that is cached already, or
+        that the combined response is missing.
+
+        Args:
+            ad: Ad with an image and copy text
+            db: Optional session for the cache lookups
+
+        Returns:
+            Unsaved image and copy analysis records (None where failed)
+        """
+        try:
+            image_data = await image_store.load(ad)
+        except Exception as e:
+            logger.error(f"Error loading image for ad {ad.ad_id}: {e}")
+            return None, await self.build_copy_analysis(ad, db)
+
+        body, title = ad.ad_creative_body, ad.ad_creative_link_title
+        image_key = analysis_cache.image_key(image_data)
+        copy_key = analysis_cache.copy_key(body, title)
+        image_result = await analysis_cache.get("image", image_key, db)
+        copy_result = await analysis_cache.get("copy", copy_key, db)
+
+        if image_result is None and copy_result is None:
+            combined = await claude_client.analyze_ad(image_data, body, title)
+            if combined:
+                image_result, copy_result = combined["image"], combined["copy"]
+                for kind, key, result in (
+                    ("image", image_key, image_result),
+                    ("copy", copy_key, copy_result),
+                ):
+                    if result:
+                        await analysis_cache.put(kind, key, result)
+
+        if not image_result:
+            image_result = await claude_client.analyze_image_data(image_data)
+            if image_result:
+                await analysis_cache.put("image", image_key, image_result)
+        if not copy_result:
+            copy_result = await claude_client.analyze_copy(body=body, title=title)
+            if copy_result:
+                await analysis_cache.put("copy", copy_key, copy_result)
+
+        image_analysis = copy_analysis = None
+        if image_result:
+            image_analysis = self._create_image_analysis(
+                ad.ad_id, image_result, image_key
+            )
+        else:
+            logger.error(f"Failed to analyze image for ad: {ad.ad_id}")
+        if copy_result:
+            copy_analysis = self._create_copy_analysis(ad.ad_id, copy_result, copy_key)
+        else:
+            logger.error(f"Failed to analyze copy for ad: {ad.ad_id}")
+
+        return image_analysis, copy_analysis
+
     def _create_image_analysis(
-        self, ad_id: str, result: Dict[str, Any]
+        self, ad_id: str, result: Dict[str, Any], content_hash: Optional[str] = None
     ) -> AdsAnalysisImage:
         """Create image analysis record from Claude response."""
         composition = result.get("composition", {})
@@ -149,11 +682,12 @@ class AdAnalyzer:
             mentioned_regions=result.get("mentioned_regions", []),
             # Raw
             analysis_raw=result,
+            content_hash=content_hash,
             analyzed_at=datetime.utcnow(),
         )
 
     def _create_copy_analysis(
-        self, ad_id: str, result: Dict[str, Any]
+        self, ad_id: str, result: Dict[str, Any], content_hash: Optional[str] = None
     ) -> AdsAnalysisCopy:
         """Create copy analysis record from Claude response."""
         structure = result.get("structure", {})
@@ -187,6 +721,7 @@ class AdAnalyzer:
             keywords=result.get("keywords", []),
             # Raw
             analysis_raw=result,
+            content_hash=content_hash,
             analyzed_at=datetime.utcnow(),
         )
 
@@ -0,0 +1,256 @@
+"""Concurrent batch analysis of ads."""
+
+import asyncio
+import logging
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.core.task_dedup import task_dedup
+from app.models.ad import AdRaw
+from app.services.analyzer import ANALYSIS_MODELS, analyzer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AdAnalysisResult:
+    """Outcome of one ad in a batch."""
+
+    ad_id: str
+    analyzed: List[str] = field(default_factory=list)
+    # analysis type -> reason
+    skipped: Dict[str, str] = field(default_factory=dict)
+    failed: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def success(self) -> bool:
+        """True if no requested analysis failed."""
+        return not self.failed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "success": self.success}
+
+
+ResultCallback = Callable[[AdAnalysisResult], None]
+
+
+class BatchAnalyzer:
+    """
+    Analyze many ads with bounded concurrency.
+
+    Up to ``concurrency`` ads are in flight at once. The image and copy
+    calls of each ad run concurrently, or as a single call in ``combined``
+    mode. All ads and their existing analyses are loaded with one query up
+    front, and new analyses are written with bulk upserts in groups of
+    ``commit_every``, so a database connection is only held while loading
+    and flushing, never during Claude calls. Analyses that another task is
+    running at the same moment are skipped (see ``TaskDedup``).
+
+    Usage:
+        results = await BatchAnalyzer(async_session).run(ad_ids, ["image"])
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        concurrency: Optional[int] = None,
+        commit_every: Optional[int] = None,
+        combined: Optional[bool] = None,
+    ):
+        self.session_factory = session_factory
+        self.concurrency = concurrency or settings.analysis_batch_concurrency
+        self.commit_every = commit_every or settings.analysis_commit_every
+        self.combined = settings.analysis_combined if combined is None else combined
+
+        self._lock = asyncio.Lock()
+        self._pending: List[Tuple[AdAnalysisResult, str, Any]] = []
+        self._on_result: Optional[ResultCallback] = None
+
+    async def run(
+        self,
+        ad_ids: List[str],
+        types: List[str],
+        on_result: Optional[ResultCallback] = None,
+    ) -> List[AdAnalysisResult]:
+        """
+        Analyze ads and store the results.
+
+        Args:
+            ad_ids: Ad IDs to analyze (duplicates are ignored)
+            types: Analysis types ("image", "copy")
+            on_result: Called with each ad's result once it is final
+
+        Returns:
+            One result per distinct ad ID, in input order
+        """
+        types = [t for t in ANALYSIS_MODELS if t in types]
+        ad_ids = list(dict.fromkeys(ad_ids))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        self._on_result = on_result
+
+        async def analyze_one(ad_id: str) -> AdAnalysisResult:
+            async with semaphore:
+                return await self._analyze_ad(ad_id, types, targets.get(ad_id))
+
+        try:
+            try:
+                async with self.session_factory() as session:
+                    targets = await analyzer.load_targets(session, ad_ids)
+            except Exception as e:
+                logger.error(f"Error loading {len(ad_ids)} ads: {e}")
+                results = [
+                    AdAnalysisResult(ad_id=ad_id, failed={t: str(e) for t in types})
+                    for ad_id in ad_ids
+                ]
+                for result in results:
+                    self._report(result)
+                return results
+
+            results = await asyncio.gather(*(analyze_one(ad_id) for ad_id in ad_ids))
+            async with self._lock:
+                await self._flush()
+            return list(results)
+        finally:
+            self._on_result = None
+
+    async def _analyze_ad(
+        self,
+        ad_id: str,
+        types: List[str],
+        target: Optional[Tuple[AdRaw, Set[str]]],
+    ) -> AdAnalysisResult:
+        """Analyze one preloaded ad and queue its records for the next flush."""
+        result = AdAnalysisResult(ad_id=ad_id)
+
+        if not target:
+            result.failed = {t: "Ad not found" for t in types}
+            self._report(result)
+            return result
+        ad, done = target
+
+        needed = []
+        for analysis_type in types:
+            if analysis_type in done:
+                result.skipped[analysis_type] = "Already analyzed"
+            elif analysis_type == "image" and not analyzer.has_image(ad):
+                result.skipped[analysis_type] = "No image"
+            elif analysis_type == "copy" and not analyzer.has_copy(ad):
+                result.skipped[analysis_type] = "No copy text"
+            else:
+                needed.append(analysis_type)
+
+        # Another task may be analyzing the ad right now; leave those types
+        # to it. The locks only need to cover the Claude calls: results are
+        # in the analysis cache by the time they are released.
+        keys = {f"{analysis_type}:{ad_id}": analysis_type for analysis_type in needed}
+        async with task_dedup.hold("analysis", keys) as held:
+            for key in keys.keys() - set(held):
+                result.skipped[keys[key]] = "Already in progress"
+            needed = [keys[key] for key in held]
+            outcomes = await self._build(ad, needed)
+
+        records = []
+        for analysis_type, outcome in zip(needed, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(
+                    f"Error analyzing {analysis_type} of ad {ad_id}: {outcome}"
+                )
+                result.failed[analysis_type] = str(outcome)
+            elif outcome is None:
+                result.failed[analysis_type] = "Analysis failed"
+            else:
+                records.append((result, analysis_type, outcome))
+
+        if not records:
+            self._report(result)
+            return result
+
+        async with self._lock:
+            self._pending.extend(records)
+            if len(self._pending) >= self.commit_every:
+                await self._flush()
+
+        return result
+
+    async def _build(self, ad: AdRaw, needed: List[str]) -> List[Any]:
+        """Build the needed analysis records; exceptions are returned."""
+        if self.combined and needed == ["image", "copy"]:
+            try:
+                return list(await analyzer.build_combined_analysis(ad))
+            except Exception as e:
+                return [e, e]
+
+        builders = {
+            "image": analyzer.build_image_analysis,
+            "copy": analyzer.build_copy_analysis,
+        }
+        return await asyncio.gather(
+            *(builders[analysis_type](ad) for analysis_type in needed),
+            return_exceptions=True,
+        )
+
+    async def _flush(self) -> None:
+        """Upsert and commit pending records; the caller holds the lock."""
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+
+        async with self.session_factory() as db:
+            try:
+                stored = await analyzer.store_analyses(
+                    db, [record for _, _, record in batch]
+                )
+                await db.commit()
+                for result, analysis_type, _ in batch:
+                    self._mark_stored(result, analysis_type, stored)
+            except Exception as e:
+                # One bad row fails the whole group; retry row by row
+                logger.warning(f"Group commit of {len(batch)} analyses failed: {e}")
+                await db.rollback()
+                for result, analysis_type, record in batch:
+                    await self._commit_one(db, result, analysis_type, record)
+
+        logger.info(f"Committed {len(batch)} analyses")
+        for result in {id(result): result for result, _, _ in batch}.values():
+            self._report(result)
+
+    async def _commit_one(
+        self,
+        db: AsyncSession,
+        result: AdAnalysisResult,
+        analysis_type: str,
+        record: Any,
+    ) -> None:
+        """Commit a single record after a failed group commit."""
+        try:
+            stored = await analyzer.store_analyses(db, [record])
+            await db.commit()
+            self._mark_stored(result, analysis_type, stored)
+        except Exception as e:
+            await db.rollback()
+            logger.error(
+                f"Error saving {analysis_type} analysis of {result.ad_id}: {e}"
+            )
+            result.failed[analysis_type] = str(e)
+
+    def _mark_stored(
+        self,
+        result: AdAnalysisResult,
+        analysis_type: str,
+        stored: Set[Tuple[str, str]],
+    ) -> None:
+        """Record whether an upserted analysis was new."""
+        if (analysis_type, result.ad_id) in stored:
+            result.analyzed.append(analysis_type)
+        else:
+            # Stored concurrently by another task
+            result.skipped[analysis_type] = "Already analyzed"
+
+    def _report(self, result: AdAnalysisResult) -> None:
+        """Pass a final result to the callback."""
+        if self._on_result:
+            self._on_result(result)
@@ -1,14 +1,150 @@
+import asyncio
+import contextlib
+import json
 import logging
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 
 import httpx
 
 from app.config import settings
+from app.core.http import http_clients
 
 logger = logging.getLogger(__name__)
 
-META_AD_LIBRARY_URL = "https://graph.facebook.com/v18.0/ads_archive"
+# Called after each page with (search_term, new_ads, term_checkpoint)
+PageCallback = Callable[[str, List[Dict[str, Any]], Dict[str, Any]], Awaitable[None]]
+
+# Decides from a page of parsed ads whether to stop paging that term
+PagePredicate = Callable[[List[Dict[str, Any]]], Awaitable[bool]]
+
+# Graph API error codes that signal rate limiting rather than a bad request
+META_THROTTLE_ERROR_CODES = {4, 17, 32, 613}
+
+
+class AdaptiveThrottle:
+    """
+    Paces Graph API requests from Meta's usage headers.
+
+    Meta reports usage as percentages of the quota in ``x-app-usage`` and
+    ``x-business-use-case-usage``. Below ``slowdown_pct`` requests go out
+    immediately; above it a delay grows linearly up to ``max_delay``; at
+    ``pause_pct`` requests wait until Meta's estimated regain time.
+    """
+
+    def __init__(
+        self,
+        slowdown_pct: float = 75.0,
+        pause_pct: float = 95.0,
+        max_delay: float = 10.0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.slowdown_pct = slowdown_pct
+        self.pause_pct = pause_pct
+        self.max_delay = max_delay
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.usage_pct = 0.0
+        self._resume_at = 0.0
+
+    def observe(self, headers: httpx.Headers) -> None:
+        """Update usage from the headers of a Graph API response."""
+        usage = 0.0
+        regain_minutes = 0
+
+        app_usage = _load_header_json(headers.get("x-app-usage"))
+        if isinstance(app_usage, dict):
+            usage = max(usage, _max_usage_pct(app_usage))
+
+        buc_usage = _load_header_json(headers.get("x-business-use-case-usage"))
+        if isinstance(buc_usage, dict):
+            for entries in buc_usage.values():
+                for entry in entries if isinstance(entries, list) else []:
+                    usage = max(usage, _max_usage_pct(entry))
+                    regain_minutes = max(
+                        regain_minutes,
+                        int(entry.get("estimated_time_to_regain_access") or 0),
+                    )
+
+        self.usage_pct = usage
+        if regain_minutes:
+            self.pause_for(regain_minutes * 60)
+        elif usage >= self.pause_pct:
+            self.pause_for(self.backoff_max)
+
+    def pause_for(self, seconds: float) -> None:
+        """Hold all requests for at least ``seconds``."""
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def delay(self) -> float:
+        """Seconds to wait before the next request."""
+        paused = self._resume_at - time.monotonic()
+        if paused > 0:
+            return paused
+        if self.usage_pct <= self.slowdown_pct:
+            return 0.0
+        span = max(self.pause_pct - self.slowdown_pct, 1.0)
+        ratio = min((self.usage_pct - self.slowdown_pct) / span, 1.0)
+        return ratio * self.max_delay
+
+    async def wait(self) -> None:
+        """Sleep as long as current usage requires."""
+        delay = self.delay()
+        if delay > 0:
+            logger.info(
+                f"Meta API usage at {self.usage_pct:.0f}%, waiting {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for retry ``attempt`` (0-based)."""
+        cap = min(self.backoff_max, self.backoff_base * (2**attempt))
+        return random.uniform(0, cap)
+
+
+@dataclass
+class AdPage:
+    """One page of parsed ads for a search term, with its resume point."""
+
+    term: str
+    ads: List[Dict[str, Any]]
+    checkpoint: Dict[str, Any]
+
+
+@dataclass
+class _TermCursor:
+    """Pagination state for a single search term."""
+
+    term: str
+    # Graph API ``after`` cursor of the next page; None for the first page
+    after: Optional[str] = None
+    exhausted: bool = False
+    fetched: int = 0
+    budget: int = 0
+    failed: bool = False
+
+    @property
+    def finished(self) -> bool:
+        """Whether no more pages will be fetched for this term."""
+        return self.exhausted or self.failed
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        JSON-serializable resume point for this term.
+
+        Only the paging cursor is kept, never Meta's ``paging.next`` URL:
+        that URL carries the access token, and resuming from it would also
+        reuse a token that has since been rotated.
+        """
+        return {
+            "after": self.after,
+            "exhausted": self.exhausted,
+            "fetched": self.fetched,
+        }
 
 
 class MetaAdCollector:
@@ -16,7 +152,14 @@ class MetaAdCollector:
 
     def __init__(self):
         self.access_token = settings.meta_access_token
-        self.base_url = META_AD_LIBRARY_URL
+        self.base_url = settings.meta_ad_library_url
+        self.throttle = AdaptiveThrottle(
+            slowdown_pct=settings.collector_usage_slowdown_pct,
+            pause_pct=settings.collector_usage_pause_pct,
+            backoff_base=settings.collector_backoff_base,
+            backoff_max=settings.collector_backoff_max,
+        )
+        self.max_retries = settings.collector_max_retries
 
     async def search_ads(
         self,
@@ -24,54 +167,239 @@ class MetaAdCollector:
         country: str = "KR",
         limit: int = 50,
         ad_reached_countries: Optional[List[str]] = None,
+        max_concurrent_terms: Optional[int] = None,
+        max_concurrent_pages: Optional[int] = None,
+        resume_from: Optional[Dict[str, Dict[str, Any]]] = None,
+        delivered_since: Optional[date] = None,
+        stop_when: Optional[PagePredicate] = None,
     ) -> List[Dict[str, Any]]:
         """
         Search ads from Meta Ad Library.
 
+        Terms are fetched concurrently and the ``limit`` budget is split
+        evenly between them. Budget left over by terms that run out of
+        results is handed to the terms that still have pages. Results are
+        returned in ``search_terms`` order regardless of completion order.
+        Use ``iter_ads`` to process pages while fetching continues.
+
         Args:
             search_terms: List of search keywords
             country: Country code (default: KR)
             limit: Maximum number of ads to fetch
             ad_reached_countries: Countries where ad was shown
+            max_concurrent_terms: Max terms fetched at once (1 = sequential)
+            max_concurrent_pages: Max page requests in flight across all terms
+            resume_from: Checkpoints by term from a previous run
+            delivered_since: Only ads delivered on or after this date
+            stop_when: Async predicate on each page; True ends that term
 
         Returns:
-            List of ad data dictionaries
+            List of ad data dictionaries fetched in this run
+        """
+        search_terms = list(dict.fromkeys(search_terms))
+        results: Dict[str, List[Dict[str, Any]]] = {term: [] for term in search_terms}
+
+        async def keep(term: str, ads: List[Dict[str, Any]], _: Dict[str, Any]):
+            results[term].extend(ads)
+
+        await self._fetch_terms(
+            search_terms,
+            country=country,
+            limit=limit,
+            ad_reached_countries=ad_reached_countries,
+            max_concurrent_terms=max_concurrent_terms,
+            max_concurrent_pages=max_concurrent_pages,
+            resume_from=resume_from,
+            delivered_since=delivered_since,
+            stop_when=stop_when,
+            on_page=keep,
+        )
+
+        return [ad for term in search_terms for ad in results[term]]
+
+    async def iter_ads(
+        self,
+        search_terms: List[str],
+        country: str = "KR",
+        limit: int = 50,
+        ad_reached_countries: Optional[List[str]] = None,
+        max_concurrent_terms: Optional[int] = None,
+        max_concurrent_pages: Optional[int] = None,
+        resume_from: Optional[Dict[str, Dict[str, Any]]] = None,
+        delivered_since: Optional[date] = None,
+        stop_when: Optional[PagePredicate] = None,
+        max_buffered_pages: Optional[int] = None,
+    ) -> AsyncIterator[AdPage]:
+        """
+        Stream ads from Meta Ad Library page by page.
+
+        Fetching runs in the background with the same concurrency and
+        budget rules as ``search_ads`` and stays at most
+        ``max_buffered_pages`` ahead of the consumer. Pages arrive in
+        completion order; each carries its term's checkpoint, which can be
+        passed back as ``resume_from`` to continue an interrupted run.
+
+        Args:
+            search_terms: List of search keywords
+            country: Country code (default: KR)
+            limit: Maximum number of ads to fetch, including resumed ones
+            ad_reached_countries: Countries where ad was shown
+            max_concurrent_terms: Max terms fetched at once (1 = sequential)
+            max_concurrent_pages: Max page requests in flight across all terms
+            resume_from: Checkpoints by term from a previous run
+            delivered_since: Only ads delivered on or after this date
+            stop_when: Async predicate on each page; True ends that term
+            max_buffered_pages: Pages fetched ahead of the consumer
+
+        Yields:
+            AdPage for every fetched page
         """
-        all_ads = []
+        queue: asyncio.Queue = asyncio.Queue(
+            maxsize=max_buffered_pages or settings.collector_max_buffered_pages
+        )
+        end = object()
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            for term in search_terms:
+        async def enqueue(
+            term: str, ads: List[Dict[str, Any]], checkpoint: Dict[str, Any]
+        ):
+            await queue.put(AdPage(term=term, ads=ads, checkpoint=checkpoint))
+
+        async def produce() -> None:
+            try:
+                await self._fetch_terms(
+                    list(dict.fromkeys(search_terms)),
+                    country=country,
+                    limit=limit,
+                    ad_reached_countries=ad_reached_countries,
+                    max_concurrent_terms=max_concurrent_terms,
+                    max_concurrent_pages=max_concurrent_pages,
+                    resume_from=resume_from,
+                    delivered_since=delivered_since,
+                    stop_when=stop_when,
+                    on_page=enqueue,
+                )
+            finally:
+                # Nobody is reading any more once the consumer cancels us
+                if not asyncio.current_task().cancelling():
+                    await queue.put(end)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (page := await queue.get()) is not end:
+                yield page
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await producer
+
+    async def _fetch_terms(
+        self,
+        search_terms: List[str],
+        country: str,
+        limit: int,
+        ad_reached_countries: Optional[List[str]],
+        max_concurrent_terms: Optional[int],
+        max_concurrent_pages: Optional[int],
+        resume_from: Optional[Dict[str, Dict[str, Any]]],
+        delivered_since: Optional[date],
+        stop_when: Optional[PagePredicate],
+        on_page: PageCallback,
+    ) -> None:
+        """Fetch all terms concurrently under a shared, fairly split budget."""
+        if not search_terms or limit <= 0:
+            return
+
+        term_slots = asyncio.Semaphore(
+            max_concurrent_terms or settings.collector_max_concurrent_terms
+        )
+        page_slots = asyncio.Semaphore(
+            max_concurrent_pages or settings.collector_max_concurrent_pages
+        )
+        cursors = [
+            self._make_cursor(term, (resume_from or {}).get(term))
+            for term in search_terms
+        ]
+
+        async def fetch(cursor: _TermCursor, quota: int) -> None:
+            cursor.budget += quota
+            async with term_slots:
                 try:
-                    ads = await self._fetch_ads_for_term(
+                    await self._fetch_ads_for_term(
                         client=client,
-                        search_term=term,
+                        cursor=cursor,
                         country=country,
-                        limit=limit - len(all_ads),
+                        limit=cursor.budget,
                         ad_reached_countries=ad_reached_countries,
+                        delivered_since=delivered_since,
+                        page_slots=page_slots,
+                        stop_when=stop_when,
+                        on_page=on_page,
                     )
-                    all_ads.extend(ads)
-
-                    if len(all_ads) >= limit:
-                        break
-
                 except Exception as e:
-                    logger.error(f"Error fetching ads for term '{term}': {e}")
-                    continue
+                    logger.error(f"Error fetching ads for term '{cursor.term}': {e}")
+                    cursor.failed = True
+
+        client = http_clients.get("meta_graph")
+        open_cursors = [cursor for cursor in cursors if not cursor.finished]
+        while open_cursors:
+            remaining = limit - sum(cursor.fetched for cursor in cursors)
+            if remaining <= 0:
+                break
 
-        return all_ads[:limit]
+            quotas = _split_budget(remaining, len(open_cursors))
+            await asyncio.gather(
+                *(
+                    fetch(cursor, quota)
+                    for cursor, quota in zip(open_cursors, quotas)
+                    if quota > 0
+                )
+            )
+
+            # Only terms that filled their budget can absorb what is left
+            open_cursors = [
+                cursor
+                for cursor, quota in zip(open_cursors, quotas)
+                if quota > 0 and cursor.fetched >= cursor.budget and not cursor.finished
+            ]
+
+    def _make_cursor(
+        self, term: str, checkpoint: Optional[Dict[str, Any]] = None
+    ) -> _TermCursor:
+        """Create a cursor for a term, optionally resuming from a checkpoint."""
+        if not checkpoint:
+            return _TermCursor(term=term)
+
+        fetched = checkpoint.get("fetched", 0)
+        return _TermCursor(
+            term=term,
+            after=checkpoint.get("after"),
+            exhausted=checkpoint.get("exhausted", False),
+            fetched=fetched,
+            budget=fetched,
+        )
 
     async def _fetch_ads_for_term(
         self,
         client: httpx.AsyncClient,
-        search_term: str,
+        cursor: _TermCursor,
         country: str,
         limit: int,
         ad_reached_countries: Optional[List[str]] = None,
-    ) -> List[Dict[str, Any]]:
-        """Fetch ads for a single search term."""
+        delivered_since: Optional[date] = None,
+        page_slots: Optional[asyncio.Semaphore] = None,
+        stop_when: Optional[PagePredicate] = None,
+        on_page: Optional[PageCallback] = None,
+    ) -> int:
+        """
+        Fetch pages for a single search term until ``limit`` ads are fetched.
+
+        Returns the term's total fetched count.
+        """
         params = {
             "access_token": self.access_token,
-            "search_terms": search_term,
+            "search_terms": cursor.term,
             "ad_type": "ALL",
             "ad_reached_countries": ad_reached_countries or [country],
             "ad_active_status": "ALL",
@@ -94,40 +422,101 @@ class MetaAdCollector:
                     "impressions",
                 ]
             ),
-            "limit": min(limit, 100),  # API max is 100 per request
         }
+        if delivered_since:
+            params["ad_delivery_date_min"] = delivered_since.isoformat()
+        page_slots = page_slots or asyncio.Semaphore(1)
 
-        ads = []
-        next_url = self.base_url
-
-        while next_url and len(ads) < limit:
+        while not cursor.finished and cursor.fetched < limit:
             try:
-                if next_url == self.base_url:
-                    response = await client.get(next_url, params=params)
-                else:
-                    response = await client.get(next_url)
-
-                response.raise_for_status()
-                data = response.json()
-
-                batch_ads = data.get("data", [])
-                for ad in batch_ads:
+                # Ask only for what the budget allows; Graph API cursors
+                # accept a different page size on every request.
+                page_size = min(limit - cursor.fetched, 100)  # API max is 100
+                page_params = {**params, "limit": page_size}
+                if cursor.after:
+                    page_params["after"] = cursor.after
+
+                data = await self._get_page(
+                    client, self.base_url, params=page_params, page_slots=page_slots
+                )
+
+                page_ads = []
+                for ad in data.get("data", []):
                     parsed_ad = self._parse_ad(ad)
                     if parsed_ad:
-                        ads.append(parsed_ad)
+                        page_ads.append(parsed_ad)
+                page_ads = page_ads[: limit - cursor.fetched]
+                cursor.fetched += len(page_ads)
 
-                # Get next page
+                # Get next page; "next" is only present when there is one
                 paging = data.get("paging", {})
-                next_url = paging.get("next")
+                cursor.after = paging.get("cursors", {}).get("after")
+                cursor.exhausted = not (paging.get("next") and cursor.after)
+
+                if stop_when and await stop_when(page_ads):
+                    logger.info(f"Stopping early for term '{cursor.term}'")
+                    cursor.exhausted = True
+
+                if on_page:
+                    await on_page(cursor.term, page_ads, cursor.checkpoint())
 
             except httpx.HTTPStatusError as e:
-                logger.error(f"HTTP error: {e.response.status_code} - {e.response.text}")
-                break
+                logger.error(
+                    f"HTTP error: {e.response.status_code} - {e.response.text}"
+                )
+                cursor.failed = True
             except Exception as e:
                 logger.error(f"Error fetching ads: {e}")
-                break
+                cursor.failed = True
 
-        return ads
+        return cursor.fetched
+
+    async def _get_page(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        page_slots: asyncio.Semaphore,
+    ) -> Dict[str, Any]:
+        """
+        GET one Graph API page, retrying throttling and server errors.
+
+        The same request is retried, so a paging cursor is resumed rather than
+        restarted. Raises the last error once retries are exhausted.
+        """
+        attempt = 0
+        while True:
+            await self.throttle.wait()
+            retry_after = None
+            try:
+                async with page_slots:
+                    response = await client.get(url, params=params)
+                self.throttle.observe(response.headers)
+
+                if not _is_retryable(response):
+                    response.raise_for_status()
+                    return response.json()
+
+                retry_after = _retry_after_seconds(response)
+                if attempt >= self.max_retries:
+                    response.raise_for_status()
+                reason = f"HTTP {response.status_code}"
+
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                reason = type(e).__name__
+
+            delay = retry_after or self.throttle.backoff(attempt)
+            if retry_after is not None:
+                # Retry-After applies to every request, not just this term
+                self.throttle.pause_for(delay)
+            attempt += 1
+            logger.warning(
+                f"Meta API request failed ({reason}), "
+                f"retry {attempt}/{self.max_retries} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
 
     def _parse_ad(self, raw_ad: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Parse raw ad data from API response."""
@@ -209,14 +598,57 @@ class MetaAdCollector:
         if not snapshot_url:
             return None
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.get(snapshot_url)
-                response.raise_for_status()
-                return response.content
-            except Exception as e:
-                logger.error(f"Error downloading snapshot: {e}")
-                return None
+        client = http_clients.get("meta_snapshots")
+        try:
+            response = await client.get(snapshot_url)
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            logger.error(f"Error downloading snapshot: {e}")
+            return None
+
+
+def _load_header_json(value: Optional[str]) -> Any:
+    """Decode a JSON-valued response header, ignoring malformed values."""
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def _max_usage_pct(usage: Dict[str, Any]) -> float:
+    """Highest of the call count / CPU time / total time percentages."""
+    values = [usage.get(key) for key in ("call_count", "total_cputime", "total_time")]
+    return float(max((v for v in values if isinstance(v, (int, float))), default=0))
+
+
+def _is_retryable(response: httpx.Response) -> bool:
+    """Whether a response is a transient throttle or server error."""
+    if response.status_code == 429 or response.status_code >= 500:
+        return True
+    if response.status_code in (400, 403):
+        try:
+            error = response.json().get("error", {})
+        except ValueError:
+            return False
+        return error.get("code") in META_THROTTLE_ERROR_CODES
+    return False
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a numeric ``Retry-After`` header."""
+    try:
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _split_budget(total: int, parts: int) -> List[int]:
+    """Split ``total`` into ``parts`` near-equal shares, larger shares first."""
+    share, extra = divmod(total, parts)
+    return [share + 1 if i < extra else share for i in range(parts)]
 
 
 # Singleton instance
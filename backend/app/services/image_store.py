@@ -0,0 +1,153 @@
+"""Image bytes for analysis, read from our own storage where possible."""
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from app.config import settings
+from app.core.claude import claude_client
+from app.models.ad import AdRaw
+from app.services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Served at /static by the API (see app.main); screenshots live below it
+STATIC_DIR = Path("/app/static")
+STATIC_PREFIX = "/static/"
+
+# Trim the S3 disk cache after this many new files
+TRIM_EVERY = 100
+
+
+class ImageStore:
+    """
+    Load ad images for analysis.
+
+    ``image_s3_path`` is either a local screenshot path ("/static/...") or
+    an S3 key written by the snapshot pipeline. Both are read before the
+    remote URL is fetched: stored copies save an external request per
+    analysis and outlive Meta's expiring snapshot URLs. S3 objects are
+    kept in a local disk cache, since keys are never overwritten.
+    """
+
+    def __init__(self):
+        self.cache_dir = Path(settings.image_cache_dir)
+        self.cache_max_bytes = settings.image_cache_max_mb * 1024 * 1024
+        self._writes = 0
+
+    async def load(self, ad: AdRaw) -> bytes:
+        """
+        Get the image bytes of an ad.
+
+        Args:
+            ad: Ad with an image (see ``AdAnalyzer.has_image``)
+
+        Returns:
+            Image bytes, as stored or as served
+
+        Raises:
+            Exception: If there is no stored copy and the download fails
+        """
+        if ad.image_s3_path:
+            data = await self.read_stored(ad.image_s3_path)
+            if data:
+                return data
+            logger.info(f"Stored image of ad {ad.ad_id} unavailable, downloading")
+
+        return await claude_client.download_image(ad.image_url or ad.ad_snapshot_url)
+
+    async def read_stored(self, path: str) -> Optional[bytes]:
+        """
+        Read an image from local static files or S3.
+
+        Args:
+            path: Value of ``image_s3_path``
+
+        Returns:
+            Image bytes or None if not available
+        """
+        try:
+            if path.startswith(STATIC_PREFIX):
+                return await asyncio.to_thread(self._read_static, path)
+            return await self._read_s3(path)
+        except Exception as e:
+            logger.warning(f"Error reading stored image {path}: {e}")
+            return None
+
+    def _read_static(self, path: str) -> Optional[bytes]:
+        """Read a file served under /static."""
+        root = STATIC_DIR.resolve()
+        file_path = (root / path[len(STATIC_PREFIX) :]).resolve()
+        if not file_path.is_relative_to(root) or not file_path.is_file():
+            return None
+        return file_path.read_bytes()
+
+    async def _read_s3(self, s3_path: str) -> Optional[bytes]:
+        """Read an S3 object through the local disk cache."""
+        # Hashed names keep arbitrary keys inside the cache directory
+        cache_path = self.cache_dir / hashlib.sha256(s3_path.encode()).hexdigest()
+
+        data = await asyncio.to_thread(self._read_cached, cache_path)
+        if data is not None:
+            return data
+
+        data = await storage.download_image_async(s3_path)
+        if data:
+            await asyncio.to_thread(self._write_cached, cache_path, data)
+        return data
+
+    def _read_cached(self, cache_path: Path) -> Optional[bytes]:
+        try:
+            data = cache_path.read_bytes()
+        except FileNotFoundError:
+            return None
+        # Mark as recently used for trimming
+        os.utime(cache_path)
+        return data
+
+    def _write_cached(self, cache_path: Path, data: bytes) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so concurrent readers never see partial files
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Error caching image {cache_path.name}: {e}")
+            return
+
+        self._writes += 1
+        if self._writes % TRIM_EVERY == 0:
+            self._trim()
+
+    def _trim(self) -> None:
+        """Delete least recently used files beyond the size limit."""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.cache_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+
+        if removed:
+            logger.info(f"Trimmed {removed} files from the image cache")
+
+
+# Singleton instance
+image_store = ImageStore()
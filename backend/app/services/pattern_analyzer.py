@@ -293,11 +293,14 @@ async def generate_formula(
 ```"""
 
     try:
-        # Call Claude
-        message = claude_client.client.messages.create(
-            model=claude_client.model,
-            max_tokens=2048,
-            messages=[{"role": "user", "content": prompt}],
+        # Call Claude within the shared rate limits
+        message = await claude_client._create_message(
+            "formula",
+            {
+                "model": claude_client.model,
+                "max_tokens": 2048,
+                "messages": [{"role": "user", "content": prompt}],
+            },
         )
 
         response_text = message.content[0].text
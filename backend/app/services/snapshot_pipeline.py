@@ -0,0 +1,126 @@
+"""Concurrent download/upload pipeline for ad snapshot images."""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.services.collector import collector
+from app.services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Batch:
+    """Ads submitted together; resolves when every ad has been processed."""
+
+    ads: List[Dict[str, Any]]
+    pending: int
+    future: asyncio.Future
+
+
+class SnapshotPipeline:
+    """
+    Producer/consumer pipeline for ad snapshots.
+
+    Submitted ads flow through a bounded download queue served by
+    ``download_workers`` and a bounded upload queue served by
+    ``upload_workers``. A full queue makes ``submit`` wait, so the caller
+    (and the API fetch behind it) slows to the pace of the slowest stage.
+
+    Each ad whose snapshot downloads gets ``image_url`` set, and
+    ``image_s3_path`` once the upload finishes.
+
+    Usage:
+        async with SnapshotPipeline() as pipeline:
+            done = await pipeline.submit(ads)
+            ads = await done
+    """
+
+    def __init__(
+        self,
+        download_workers: Optional[int] = None,
+        upload_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+    ):
+        self.download_workers = download_workers or settings.snapshot_download_workers
+        self.upload_workers = upload_workers or settings.snapshot_upload_workers
+        queue_size = queue_size or settings.snapshot_queue_size
+        self._downloads: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._uploads: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._workers: List[asyncio.Task] = []
+
+    async def __aenter__(self) -> "SnapshotPipeline":
+        self._workers = [
+            asyncio.create_task(self._download_worker())
+            for _ in range(self.download_workers)
+        ] + [
+            asyncio.create_task(self._upload_worker())
+            for _ in range(self.upload_workers)
+        ]
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, ads: List[Dict[str, Any]]) -> asyncio.Future:
+        """
+        Queue ads for snapshot processing.
+
+        Returns a future resolving to ``ads`` once all of them are done.
+        Waits while the download queue is full.
+        """
+        batch = _Batch(
+            ads=ads,
+            pending=len(ads),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        if not ads:
+            batch.future.set_result(ads)
+            return batch.future
+
+        for ad_data in ads:
+            await self._downloads.put((batch, ad_data))
+        return batch.future
+
+    async def _download_worker(self) -> None:
+        """Download snapshots and hand the bytes to the upload stage."""
+        while True:
+            batch, ad_data = await self._downloads.get()
+            try:
+                image_bytes = None
+                if ad_data.get("ad_snapshot_url"):
+                    image_bytes = await collector.get_ad_snapshot(
+                        ad_data["ad_snapshot_url"]
+                    )
+                if image_bytes:
+                    ad_data["image_url"] = ad_data["ad_snapshot_url"]
+                    await self._uploads.put((batch, ad_data, image_bytes))
+                    continue
+            except Exception as e:
+                logger.error(f"Error downloading snapshot for {ad_data['ad_id']}: {e}")
+            self._finish(batch)
+
+    async def _upload_worker(self) -> None:
+        """Upload downloaded snapshots to S3."""
+        while True:
+            batch, ad_data, image_bytes = await self._uploads.get()
+            try:
+                image_s3_path = await storage.upload_image_async(
+                    image_bytes, ad_data["ad_id"]
+                )
+                ad_data["image_s3_path"] = image_s3_path
+            except Exception as e:
+                logger.error(f"Error uploading snapshot for {ad_data['ad_id']}: {e}")
+            self._finish(batch)
+
+    def _finish(self, batch: _Batch) -> None:
+        """Mark one ad of a batch as processed."""
+        batch.pending -= 1
+        if batch.pending == 0 and not batch.future.done():
+            batch.future.set_result(batch.ads)
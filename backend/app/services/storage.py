@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import uuid
 from typing import Optional
@@ -69,6 +70,41 @@ class S3Storage:
             logger.error(f"Unexpected error uploading to S3: {e}")
             return None
 
+    async def upload_image_async(
+        self,
+        image_data: bytes,
+        ad_id: str,
+        content_type: str = "image/png",
+    ) -> Optional[str]:
+        """Upload image to S3 in a worker thread, keeping the event loop free."""
+        return await asyncio.to_thread(
+            self.upload_image, image_data, ad_id, content_type
+        )
+
+    def download_image(self, s3_path: str) -> Optional[bytes]:
+        """
+        Download image bytes from S3.
+
+        Args:
+            s3_path: S3 key/path
+
+        Returns:
+            Image bytes or None if failed
+        """
+        try:
+            response = self.client.get_object(Bucket=self.bucket_name, Key=s3_path)
+            return response["Body"].read()
+        except ClientError as e:
+            logger.error(f"Error downloading from S3: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error downloading from S3: {e}")
+            return None
+
+    async def download_image_async(self, s3_path: str) -> Optional[bytes]:
+        """Download image from S3 in a worker thread, keeping the event loop free."""
+        return await asyncio.to_thread(self.download_image, s3_path)
+
     def get_image_url(self, s3_path: str, expiration: int = 3600) -> Optional[str]:
         """
         Generate pre-signed URL for image.
@@ -0,0 +1,290 @@
+"""
+Local stand-in for the Anthropic Messages and Message Batches endpoints.
+
+Answers every request with a canned image or copy analysis (as text, or as
+the forced tool call when the request has ``tool_choice``), so analysis,
+bulk submission and batch polling can be exercised without API spend.
+Batches end a fixed time after they are created.
+
+Run it and point the Claude client at it:
+
+    uvicorn app.stubs.anthropic_api:app --port 8002
+    ANTHROPIC_BASE_URL=http://localhost:8002
+
+Behaviour is configured with ``ANTHROPIC_STUB_*`` environment variables
+(see ``StubSettings``).
+"""
+
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Set
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class StubSettings(BaseSettings):
+    """Stand-in behaviour, loaded from ``ANTHROPIC_STUB_*`` environment variables."""
+
+    model_config = SettingsConfigDict(
+        env_prefix="anthropic_stub_", case_sensitive=False
+    )
+
+    latency_ms: int = 800
+    # Seconds from batch creation until it reports "ended"
+    batch_seconds: float = 30.0
+    # Share of batch requests answered with an error result
+    error_rate: float = 0.0
+    # Share of tool calls with one invalid field, to exercise repairs
+    malformed_rate: float = 0.0
+
+
+@lru_cache()
+def get_stub_settings() -> StubSettings:
+    """Get cached stand-in settings."""
+    return StubSettings()
+
+
+app = FastAPI(title="Anthropic API stand-in")
+
+# batch id -> {"created": monotonic time, "created_at": datetime, "requests": [...]}
+_batches: Dict[str, Dict[str, Any]] = {}
+# Prompt prefixes marked with cache_control that have been seen
+_cached_prefixes: Set[int] = set()
+
+IMAGE_RESULT = {
+    "composition": {
+        "has_person": True,
+        "person_type": "student",
+        "text_ratio": 30,
+        "has_chart": False,
+        "logo_position": "bottom_right",
+    },
+    "colors": {
+        "primary": "#1E3A5F",
+        "secondary": "#FFFFFF",
+        "tertiary": "#F5A623",
+        "tone": "medium",
+        "saturation": "medium",
+    },
+    "layout": {
+        "type": "center_focus",
+        "atmosphere": "serious",
+        "emphasis_elements": ["숫자", "혜택"],
+    },
+    "mentioned_regions": ["목동"],
+}
+
+COPY_RESULT = {
+    "structure": {
+        "headline": "목동 입시생 83%가 선택한 이유",
+        "headline_length": 16,
+        "body": "소규모 맞춤 관리로 평균 2등급 상승",
+        "cta": "상담 신청하기",
+        "core_message": "social_proof",
+    },
+    "numbers": [{"value": 83, "unit": "%", "context": "선택률"}],
+    "offer": {
+        "discount_info": None,
+        "free_benefit": "무료 학습 진단",
+        "social_proof": "83% 선택",
+        "urgency": None,
+        "differentiation": "소규모 맞춤 관리",
+    },
+    "tone": {"formality": "formal", "emotion": "rational", "style": "stable"},
+    "target_audience": "고등학생",
+    "keywords": ["선택", "소규모", "맞춤", "관리"],
+    "regions": ["목동"],
+}
+
+
+def _blocks(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """All content blocks of a Messages request."""
+    blocks = []
+    for message in params.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            blocks.append({"type": "text", "text": content})
+        elif isinstance(content, list):
+            blocks.extend(content)
+    return blocks
+
+
+def _result(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Canned analysis matching the request: image, copy or both."""
+    blocks = _blocks(params)
+    has_image = any(block.get("type") == "image" for block in blocks)
+    has_copy = any(
+        "광고 카피" in block.get("text", "")
+        for block in blocks
+        if block.get("type") == "text"
+    )
+    if has_image and has_copy:
+        return {"image": IMAGE_RESULT, "copy": COPY_RESULT}
+    return IMAGE_RESULT if has_image else COPY_RESULT
+
+
+def _tool_input(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Tool input for a forced tool call; repair tools get only their fields."""
+    tool_name = params["tool_choice"]["name"]
+    tool = next(t for t in params.get("tools", []) if t["name"] == tool_name)
+    result = _result(params)
+
+    if tool_name.endswith("_fix"):
+        fields = tool["input_schema"].get("properties", {})
+        return {field: value for field, value in result.items() if field in fields}
+
+    if random.random() < get_stub_settings().malformed_rate:
+        result = json.loads(json.dumps(result))
+        # Out of range for image analyses, not an allowed value for copy
+        section = result.get("image", result)
+        if "composition" in section:
+            section["composition"]["text_ratio"] = 150
+        else:
+            result.get("copy", result)["tone"]["formality"] = "casual"
+    return result
+
+
+def _usage(params: Dict[str, Any], output_text: str) -> Dict[str, Any]:
+    """Token usage, simulating prompt caching of ``cache_control`` blocks."""
+    system = params.get("system")
+    blocks = system if isinstance(system, list) else []
+    cached = [block["text"] for block in blocks if block.get("cache_control")]
+    # Roughly two characters per token for Korean prompts
+    cached_tokens = sum(len(text) for text in cached) // 2
+    prefix = hash(tuple(cached))
+
+    cache_read = cached_tokens if prefix in _cached_prefixes else 0
+    cache_write = cached_tokens - cache_read
+    if cached:
+        _cached_prefixes.add(prefix)
+
+    return {
+        "input_tokens": 300,
+        "output_tokens": len(output_text) // 2,
+        "cache_read_input_tokens": cache_read,
+        "cache_creation_input_tokens": cache_write,
+    }
+
+
+def _message(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a Messages API response with a canned analysis."""
+    if params.get("tool_choice", {}).get("type") == "tool":
+        tool_input = _tool_input(params)
+        text = json.dumps(tool_input, ensure_ascii=False)
+        content = [
+            {
+                "type": "tool_use",
+                "id": f"toolu_stub_{uuid.uuid4().hex[:24]}",
+                "name": params["tool_choice"]["name"],
+                "input": tool_input,
+            }
+        ]
+        stop_reason = "tool_use"
+    else:
+        text = json.dumps(_result(params), ensure_ascii=False)
+        content = [{"type": "text", "text": text}]
+        stop_reason = "end_turn"
+
+    return {
+        "id": f"msg_stub_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get("model", "stub"),
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": _usage(params, text),
+    }
+
+
+def _batch_object(request: Request, batch_id: str) -> Dict[str, Any]:
+    """Build a MessageBatch object for a stored batch."""
+    batch = _batches[batch_id]
+    count = len(batch["requests"])
+    ended = time.monotonic() - batch["created"] >= get_stub_settings().batch_seconds
+    created_at = batch["created_at"]
+    return {
+        "id": batch_id,
+        "type": "message_batch",
+        "processing_status": "ended" if ended else "in_progress",
+        "request_counts": {
+            "processing": 0 if ended else count,
+            "succeeded": count - batch["errored"] if ended else 0,
+            "errored": batch["errored"] if ended else 0,
+            "canceled": 0,
+            "expired": 0,
+        },
+        "created_at": created_at.isoformat(),
+        "expires_at": (created_at + timedelta(hours=24)).isoformat(),
+        "ended_at": datetime.now(timezone.utc).isoformat() if ended else None,
+        "archived_at": None,
+        "cancel_initiated_at": None,
+        "results_url": (
+            str(request.url_for("batch_results", batch_id=batch_id)) if ended else None
+        ),
+    }
+
+
+@app.post("/v1/messages")
+async def create_message(request: Request):
+    """Answer one Messages API request."""
+    await asyncio.sleep(get_stub_settings().latency_ms / 1000)
+    return _message(await request.json())
+
+
+@app.post("/v1/messages/batches")
+async def create_batch(request: Request):
+    """Store a message batch."""
+    body = await request.json()
+    requests: List[Dict[str, Any]] = body.get("requests", [])
+    error_rate = get_stub_settings().error_rate
+
+    batch_id = f"msgbatch_stub_{uuid.uuid4().hex[:24]}"
+    failed = {item["custom_id"] for item in requests if random.random() < error_rate}
+    _batches[batch_id] = {
+        "created": time.monotonic(),
+        "created_at": datetime.now(timezone.utc),
+        "requests": requests,
+        "failed": failed,
+        "errored": len(failed),
+    }
+    return _batch_object(request, batch_id)
+
+
+@app.get("/v1/messages/batches/{batch_id}")
+async def retrieve_batch(request: Request, batch_id: str):
+    """Report batch status."""
+    if batch_id not in _batches:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return _batch_object(request, batch_id)
+
+
+@app.get("/v1/messages/batches/{batch_id}/results", name="batch_results")
+async def batch_results(batch_id: str):
+    """Stream batch results as JSONL."""
+    batch = _batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    lines = []
+    for item in batch["requests"]:
+        if item["custom_id"] in batch["failed"]:
+            result = {
+                "type": "errored",
+                "error": {
+                    "type": "error",
+                    "error": {"type": "api_error", "message": "Stub error"},
+                },
+            }
+        else:
+            result = {"type": "succeeded", "message": _message(item["params"])}
+        lines.append(json.dumps({"custom_id": item["custom_id"], "result": result}))
+
+    return Response(content="\n".join(lines) + "\n", media_type="application/binary")
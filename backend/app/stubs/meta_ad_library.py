@@ -0,0 +1,247 @@
+"""
+Local stand-in for the Meta Ad Library ``ads_archive`` endpoint.
+
+Serves recorded or synthetic ad pages with Graph-style ``paging.next``
+cursors, usage headers, configurable latency and injected throttling, so
+the collector and ``collect_ads`` can be load-tested without quota.
+
+Run it and point the collector at it:
+
+    uvicorn app.stubs.meta_ad_library:app --port 8001
+    META_AD_LIBRARY_URL=http://localhost:8001/v18.0/ads_archive
+
+Behaviour is configured with ``META_STUB_*`` environment variables (see
+``StubSettings``).
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import struct
+import time
+import zlib
+from collections import deque
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class StubSettings(BaseSettings):
+    """Stand-in behaviour, loaded from ``META_STUB_*`` environment variables."""
+
+    model_config = SettingsConfigDict(env_prefix="meta_stub_", case_sensitive=False)
+
+    # JSON file of recorded raw ads: a list (served for every term) or an
+    # object mapping search term -> list. Synthetic ads are used when unset.
+    fixture_path: Optional[str] = None
+    ads_per_term: int = 500
+    latency_ms: int = 150
+    latency_jitter_ms: int = 100
+    # Share of requests answered with 429 regardless of usage
+    throttle_rate: float = 0.0
+    # Calls per rolling minute that count as 100% x-app-usage
+    calls_per_minute: int = 600
+    seed: int = 42
+
+
+@lru_cache()
+def get_stub_settings() -> StubSettings:
+    """Get cached stand-in settings."""
+    return StubSettings()
+
+
+app = FastAPI(title="Meta Ad Library stand-in")
+
+_call_times: Deque[float] = deque()
+
+
+@lru_cache()
+def _load_fixture(path: str) -> Any:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _ads_for_term(term: str) -> List[Dict[str, Any]]:
+    """Recorded ads for a term, or a deterministic synthetic set."""
+    stub = get_stub_settings()
+    if stub.fixture_path:
+        fixture = _load_fixture(stub.fixture_path)
+        if isinstance(fixture, dict):
+            return fixture.get(term, [])
+        return fixture
+    return _synthetic_ads(term, stub.ads_per_term, stub.seed)
+
+
+@lru_cache(maxsize=256)
+def _synthetic_ads(term: str, count: int, seed: int) -> List[Dict[str, Any]]:
+    """Generate raw Graph API ad objects for a search term."""
+    term_seed = int(hashlib.sha256(f"{seed}:{term}".encode()).hexdigest()[:12], 16)
+    rng = random.Random(term_seed)
+    ads = []
+    for i in range(count):
+        ad_id = str(10**15 + (term_seed + i * 7919) % (9 * 10**15))
+        start = date(2026, 1, 1) + timedelta(days=rng.randint(0, 280))
+        stop = (
+            start + timedelta(days=rng.randint(1, 90)) if rng.random() < 0.6 else None
+        )
+        impressions = rng.choice([1000, 5000, 10000, 50000, 100000])
+        ads.append(
+            {
+                "id": ad_id,
+                "ad_creation_time": start.isoformat(),
+                "ad_delivery_start_time": start.isoformat(),
+                "ad_delivery_stop_time": stop.isoformat() if stop else None,
+                "ad_creative_bodies": [
+                    f"{term} 상담 신청하고 {rng.randint(10, 90)}% 할인 받으세요"
+                ],
+                "ad_creative_link_titles": [
+                    f"{term} 전문 {rng.choice(['학원', '클리닉', '센터'])}"
+                ],
+                "ad_creative_link_descriptions": ["지금 바로 확인하세요"],
+                "ad_snapshot_url": f"/ads/archive/render_ad/?id={ad_id}",
+                "page_id": str(rng.randint(10**9, 10**10)),
+                "page_name": f"{term} 페이지 {rng.randint(1, 50)}",
+                "publisher_platforms": rng.sample(
+                    ["facebook", "instagram", "audience_network", "messenger"], 2
+                ),
+                "currency": "KRW",
+                "spend": {"lower_bound": "100000", "upper_bound": "199999"},
+                "impressions": {
+                    "lower_bound": str(impressions),
+                    "upper_bound": str(impressions * 2 - 1),
+                },
+            }
+        )
+    return ads
+
+
+def _usage_pct() -> int:
+    """Record a call and return usage of the rolling one-minute quota."""
+    now = time.monotonic()
+    _call_times.append(now)
+    while _call_times and _call_times[0] < now - 60:
+        _call_times.popleft()
+    return min(100, len(_call_times) * 100 // get_stub_settings().calls_per_minute)
+
+
+def _usage_headers(usage: int) -> Dict[str, str]:
+    regain = 1 if usage >= 100 else 0
+    return {
+        "x-app-usage": json.dumps(
+            {"call_count": usage, "total_cputime": usage // 2, "total_time": usage // 2}
+        ),
+        "x-business-use-case-usage": json.dumps(
+            {
+                "stub": [
+                    {
+                        "type": "ads_archive",
+                        "call_count": usage,
+                        "total_cputime": usage // 2,
+                        "total_time": usage // 2,
+                        "estimated_time_to_regain_access": regain,
+                    }
+                ]
+            }
+        ),
+    }
+
+
+def _encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def _decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        return 0
+
+
+@app.get("/{version}/ads_archive")
+async def ads_archive(
+    request: Request,
+    search_terms: str = Query(""),
+    limit: int = Query(25, ge=1),
+    after: Optional[str] = Query(None),
+):
+    """Serve one page of ads for a search term."""
+    stub = get_stub_settings()
+    jitter = random.uniform(-stub.latency_jitter_ms, stub.latency_jitter_ms)
+    await asyncio.sleep(max(0.0, stub.latency_ms + jitter) / 1000)
+
+    usage = _usage_pct()
+    headers = _usage_headers(usage)
+    if usage >= 100 or random.random() < stub.throttle_rate:
+        return JSONResponse(
+            status_code=429,
+            headers=headers,
+            content={
+                "error": {
+                    "message": "(#613) Calls to this api have exceeded the rate limit.",
+                    "type": "OAuthException",
+                    "code": 613,
+                }
+            },
+        )
+
+    ads = _ads_for_term(search_terms)
+    offset = _decode_cursor(after)
+    page_size = min(limit, 100)
+    page = ads[offset : offset + page_size]
+
+    snapshot_base = str(request.base_url).rstrip("/")
+    data = [
+        (
+            {**ad, "ad_snapshot_url": f"{snapshot_base}{ad['ad_snapshot_url']}"}
+            if ad.get("ad_snapshot_url", "").startswith("/")
+            else ad
+        )
+        for ad in page
+    ]
+
+    paging: Dict[str, Any] = {
+        "cursors": {
+            "before": _encode_cursor(offset),
+            "after": _encode_cursor(offset + len(page)),
+        }
+    }
+    if offset + page_size < len(ads):
+        paging["next"] = str(
+            request.url.include_query_params(after=_encode_cursor(offset + page_size))
+        )
+
+    return JSONResponse(headers=headers, content={"data": data, "paging": paging})
+
+
+@app.get("/ads/archive/render_ad/")
+async def render_ad(id: str = Query(...)):
+    """Serve a small solid-colour PNG standing in for an ad snapshot."""
+    digest = hashlib.sha256(id.encode()).digest()
+    return Response(content=_solid_png(400, 400, digest[:3]), media_type="image/png")
+
+
+@lru_cache(maxsize=1024)
+def _solid_png(width: int, height: int, rgb: bytes) -> bytes:
+    """Encode a solid-colour RGB PNG without an imaging library."""
+
+    def chunk(kind: bytes, payload: bytes) -> bytes:
+        body = kind + payload
+        return (
+            struct.pack(">I", len(payload)) + body + struct.pack(">I", zlib.crc32(body))
+        )
+
+    row = b"\x00" + rgb * width
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * height))
+        + chunk(b"IEND", b"")
+    )
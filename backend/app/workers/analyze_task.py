@@ -1,12 +1,19 @@
 import asyncio
 import logging
-from typing import List
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Tuple
 
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.config import settings
+from app.core.rate_limit import interactive_requests
+from app.core.task_dedup import task_dedup
+from app.models.ad import AnalysisBatchJob
 from app.services.analyzer import analyzer
-from app.workers.celery_app import celery_app
+from app.services.batch_analyzer import AdAnalysisResult, BatchAnalyzer
+from app.workers.celery_app import BACKFILL_QUEUE, INTERACTIVE_QUEUE, celery_app
+from app.workers.lanes import lane_metrics, task_lane
 
 logger = logging.getLogger(__name__)
 
@@ -28,83 +35,438 @@ def run_async(coro):
         return loop.run_until_complete(coro)
 
 
+async def _analyze_exclusive(
+    ad_id: str,
+    kinds: List[str],
+    analyze: Callable[[AsyncSession, str], Awaitable],
+    claimed: Optional[List[str]] = None,
+):
+    """
+    Run a single-ad analysis unless another worker is analyzing the ad.
+
+    Clears the queued markers claimed for the task once done, so the
+    analysis can be requested again if it failed.
+    """
+    # Single-ad analyses are requested from the UI
+    interactive_requests.set(True)
+
+    keys = [f"{kind}:{ad_id}" for kind in kinds]
+    try:
+        async with task_dedup.hold("analysis", keys) as held:
+            if len(held) < len(keys):
+                logger.info(f"Ad {ad_id} is already being analyzed, skipping")
+                return
+            async with async_session() as session:
+                await analyze(session, ad_id)
+    finally:
+        await task_dedup.clear("analysis", claimed or [])
+
+
+async def claim_analysis(
+    ad_ids: List[str], types: List[str]
+) -> Tuple[List[str], List[str]]:
+    """
+    Set queued markers for analyses about to be enqueued.
+
+    Args:
+        ad_ids: Ad IDs to analyze
+        types: Analysis types ("image", "copy")
+
+    Returns:
+        Ad IDs with at least one analysis type not queued already, and the
+        keys claimed for them (the task's ``claimed`` argument)
+    """
+    claimed = await task_dedup.claim(
+        "analysis", [f"{t}:{ad_id}" for ad_id in ad_ids for t in types]
+    )
+    claimed_set = set(claimed)
+    ad_ids = [
+        ad_id
+        for ad_id in dict.fromkeys(ad_ids)
+        if any(f"{t}:{ad_id}" in claimed_set for t in types)
+    ]
+    return ad_ids, claimed
+
+
 @celery_app.task(bind=True, name="app.workers.analyze_task.analyze_image")
-def analyze_image(self, ad_id: str):
+def analyze_image(self, ad_id: str, claimed: Optional[List[str]] = None):
     """
     Celery task to analyze ad image.
 
     Args:
         ad_id: Ad ID to analyze
+        claimed: Queued markers set for the task (see ``TaskDedup.claim``),
+            cleared once it has finished
     """
     logger.info(f"Starting image analysis for ad: {ad_id}")
 
     try:
-        run_async(_analyze_image_async(ad_id))
+        run_async(_analyze_image_async(ad_id, claimed))
         logger.info(f"Image analysis completed for ad: {ad_id}")
     except Exception as e:
         logger.error(f"Image analysis failed for ad {ad_id}: {e}")
         raise
 
 
-async def _analyze_image_async(ad_id: str):
+async def _analyze_image_async(ad_id: str, claimed: Optional[List[str]] = None):
     """Async implementation of image analysis."""
-    async with async_session() as session:
-        await analyzer.analyze_image(session, ad_id)
+    await _analyze_exclusive(ad_id, ["image"], analyzer.analyze_image, claimed)
 
 
 @celery_app.task(bind=True, name="app.workers.analyze_task.analyze_copy")
-def analyze_copy(self, ad_id: str):
+def analyze_copy(self, ad_id: str, claimed: Optional[List[str]] = None):
     """
     Celery task to analyze ad copy.
 
     Args:
         ad_id: Ad ID to analyze
+        claimed: Queued markers set for the task (see ``TaskDedup.claim``),
+            cleared once it has finished
     """
     logger.info(f"Starting copy analysis for ad: {ad_id}")
 
     try:
-        run_async(_analyze_copy_async(ad_id))
+        run_async(_analyze_copy_async(ad_id, claimed))
         logger.info(f"Copy analysis completed for ad: {ad_id}")
     except Exception as e:
         logger.error(f"Copy analysis failed for ad {ad_id}: {e}")
         raise
 
 
-async def _analyze_copy_async(ad_id: str):
+async def _analyze_copy_async(ad_id: str, claimed: Optional[List[str]] = None):
     """Async implementation of copy analysis."""
-    async with async_session() as session:
-        await analyzer.analyze_copy(session, ad_id)
+    await _analyze_exclusive(ad_id, ["copy"], analyzer.analyze_copy, claimed)
+
+
+@celery_app.task(bind=True, name="app.workers.analyze_task.analyze_ad")
+def analyze_ad(self, ad_id: str, claimed: Optional[List[str]] = None):
+    """
+    Celery task to analyze ad image and copy with one combined call.
+
+    Args:
+        ad_id: Ad ID to analyze
+        claimed: Queued markers set for the task (see ``TaskDedup.claim``),
+            cleared once it has finished
+    """
+    logger.info(f"Starting combined analysis for ad: {ad_id}")
+
+    try:
+        run_async(_analyze_ad_async(ad_id, claimed))
+        logger.info(f"Combined analysis completed for ad: {ad_id}")
+    except Exception as e:
+        logger.error(f"Combined analysis failed for ad {ad_id}: {e}")
+        raise
+
+
+async def _analyze_ad_async(ad_id: str, claimed: Optional[List[str]] = None):
+    """Async implementation of combined analysis."""
+    await _analyze_exclusive(ad_id, ["image", "copy"], analyzer.analyze_ad, claimed)
+
+
+def queue_for_batch(ad_ids: List[str]) -> str:
+    """Lane of an ``analyze_batch`` task: small batches are interactive."""
+    if len(ad_ids) > settings.analysis_interactive_max_ads:
+        return BACKFILL_QUEUE
+    return INTERACTIVE_QUEUE
 
 
 @celery_app.task(bind=True, name="app.workers.analyze_task.analyze_batch")
-def analyze_batch(self, ad_ids: List[str], types: List[str] = None):
+def analyze_batch(
+    self,
+    ad_ids: List[str],
+    types: List[str] = None,
+    combined: Optional[bool] = None,
+    claimed: Optional[List[str]] = None,
+):
     """
     Celery task to analyze multiple ads.
 
+    Batches from the interactive queue take priority at the Anthropic rate
+    limiter; large batches are sent to the backfill queue (see
+    ``queue_for_batch``).
+
     Args:
         ad_ids: List of ad IDs to analyze
         types: List of analysis types ("image", "copy")
+        combined: Analyze image and copy in one call; defaults to the
+            ``analysis_combined`` setting
+        claimed: Queued markers set for the task (see ``TaskDedup.claim``),
+            cleared once it has finished
+
+    Returns:
+        Counts and per-ad results (see ``AdAnalysisResult``)
     """
     types = types or ["image", "copy"]
     logger.info(f"Starting batch analysis for {len(ad_ids)} ads")
 
     try:
-        run_async(_analyze_batch_async(ad_ids, types))
-        logger.info(f"Batch analysis completed for {len(ad_ids)} ads")
+        summary = run_async(
+            _analyze_batch_async(
+                self,
+                ad_ids,
+                types,
+                combined,
+                claimed,
+                interactive=task_lane(self.request) == INTERACTIVE_QUEUE,
+            )
+        )
+        logger.info(
+            f"Batch analysis completed for {len(ad_ids)} ads: "
+            f"{summary['succeeded']} succeeded, {summary['failed']} failed"
+        )
+        return summary
     except Exception as e:
         logger.error(f"Batch analysis failed: {e}")
         raise
 
 
-async def _analyze_batch_async(ad_ids: List[str], types: List[str]):
+async def _analyze_batch_async(
+    task,
+    ad_ids: List[str],
+    types: List[str],
+    combined: Optional[bool],
+    claimed: Optional[List[str]],
+    interactive: bool = False,
+):
     """Async implementation of batch analysis."""
+    interactive_requests.set(interactive)
+    total = len(set(ad_ids))
+    finished = {"succeeded": 0, "failed": 0}
+
+    def on_result(result: AdAnalysisResult):
+        finished["succeeded" if result.success else "failed"] += 1
+        task.update_state(
+            state="PROGRESS",
+            meta={"total": total, "processed": sum(finished.values()), **finished},
+        )
+
+    try:
+        results = await BatchAnalyzer(async_session, combined=combined).run(
+            ad_ids, types, on_result
+        )
+    finally:
+        # Allow the ads to be queued again, e.g. to retry failures
+        await task_dedup.clear("analysis", claimed or [])
+
+    return {
+        "total": total,
+        "processed": len(results),
+        **finished,
+        "results": [result.to_dict() for result in results],
+    }
+
+
+@celery_app.task(bind=True, name="app.workers.analyze_task.scan_analysis_backlog")
+def scan_analysis_backlog(
+    self,
+    types: List[str] = None,
+    industry: Optional[str] = None,
+    collected_from: Optional[str] = None,
+    collected_to: Optional[str] = None,
+    combined: Optional[bool] = None,
+    after_id: int = 0,
+    queued: int = 0,
+):
+    """
+    Celery task to queue every ad that still needs analysis.
+
+    Walks unanalyzed ads in keyset pages and queues them on the backfill
+    queue as ``analyze_batch`` tasks of ``analysis_scan_chunk_size`` ads.
+    While that queue holds ``analysis_scan_max_queued`` tasks or more, the
+    scan stops and re-schedules itself from where it left off after
+    ``analysis_scan_pause`` seconds.
+
+    Args:
+        types: List of analysis types ("image", "copy")
+        industry: Only ads of this industry
+        collected_from: Only ads collected at or after this ISO datetime
+        collected_to: Only ads collected before this ISO datetime
+        combined: Passed on to ``analyze_batch``
+        after_id: Resume after this ``AdRaw.id``
+        queued: Ads queued by earlier runs of this scan
+
+    Returns:
+        Ads queued so far, the cursor, and whether the scan finished
+    """
+    types = types or ["image", "copy"]
+    filters = {
+        "industry": industry,
+        "collected_from": collected_from,
+        "collected_to": collected_to,
+    }
+
+    try:
+        after_id, count, finished = run_async(
+            _scan_analysis_backlog_async(types, filters, combined, after_id)
+        )
+    except Exception as e:
+        logger.error(f"Analysis backlog scan failed: {e}")
+        raise
+
+    queued += count
+    if finished:
+        logger.info(f"Analysis backlog scan finished, {queued} ads queued")
+    else:
+        logger.info(
+            f"Backfill queue full, pausing backlog scan at ad row {after_id} "
+            f"({queued} ads queued so far)"
+        )
+        scan_analysis_backlog.apply_async(
+            kwargs={
+                "types": types,
+                **filters,
+                "combined": combined,
+                "after_id": after_id,
+                "queued": queued,
+            },
+            countdown=settings.analysis_scan_pause,
+        )
+
+    return {"queued": queued, "after_id": after_id, "finished": finished}
+
+
+async def _scan_analysis_backlog_async(
+    types: List[str],
+    filters: dict,
+    combined: Optional[bool],
+    after_id: int,
+) -> Tuple[int, int, bool]:
+    """
+    Async implementation of the backlog scan.
+
+    Returns:
+        Cursor, ads queued in this run, and whether the scan finished
+    """
+    chunk_size = settings.analysis_scan_chunk_size
+    collected_from = filters["collected_from"]
+    collected_to = filters["collected_to"]
+    queued = 0
+
+    while True:
+        async with async_session() as session:
+            page = await analyzer.scan_pending(
+                session,
+                types,
+                after_id=after_id,
+                limit=settings.analysis_scan_page_size,
+                industry=filters["industry"],
+                collected_from=(
+                    datetime.fromisoformat(collected_from) if collected_from else None
+                ),
+                collected_to=(
+                    datetime.fromisoformat(collected_to) if collected_to else None
+                ),
+            )
+        if not page:
+            return after_id, queued, True
+
+        for start in range(0, len(page), chunk_size):
+            # The broker client is blocking; keep it off the event loop
+            depth = await asyncio.to_thread(lane_metrics.depth, BACKFILL_QUEUE)
+            if depth >= settings.analysis_scan_max_queued:
+                return after_id, queued, False
+            chunk = page[start : start + chunk_size]
+            # Ads queued by an overlapping scan or request are left to it
+            ad_ids, claimed = await claim_analysis([ad_id for _, ad_id in chunk], types)
+            if ad_ids:
+                analyze_batch.apply_async(
+                    (ad_ids, types, combined),
+                    kwargs={"claimed": claimed},
+                    queue=BACKFILL_QUEUE,
+                )
+            queued += len(ad_ids)
+            after_id = chunk[-1][0]
+
+
+@celery_app.task(bind=True, name="app.workers.analyze_task.analyze_bulk")
+def analyze_bulk(self, ad_ids: List[str], types: List[str] = None):
+    """
+    Celery task to analyze many ads through the Message Batches API.
+
+    Submits one message batch per chunk of ads and schedules
+    ``poll_bulk_analysis`` for each.
+
+    Args:
+        ad_ids: List of ad IDs to analyze
+        types: List of analysis types ("image", "copy")
+
+    Returns:
+        Submitted message batch IDs
+    """
+    types = types or ["image", "copy"]
+    logger.info(f"Starting bulk analysis for {len(ad_ids)} ads")
+
+    try:
+        batch_ids = run_async(_analyze_bulk_async(ad_ids, types))
+    except Exception as e:
+        logger.error(f"Bulk analysis submission failed: {e}")
+        raise
+
+    for batch_id in batch_ids:
+        poll_bulk_analysis.apply_async(
+            (batch_id,), countdown=settings.claude_batch_poll_interval
+        )
+
+    logger.info(f"Submitted {len(batch_ids)} message batches")
+    return batch_ids
+
+
+async def _analyze_bulk_async(ad_ids: List[str], types: List[str]) -> List[str]:
+    """Async implementation of bulk analysis submission."""
+    # Each ad may need one request per analysis type
+    chunk_size = max(1, settings.claude_batch_max_requests // len(types))
+    ad_ids = list(dict.fromkeys(ad_ids))
+
+    batch_ids = []
+    async with async_session() as session:
+        for start in range(0, len(ad_ids), chunk_size):
+            job = await analyzer.submit_bulk(
+                session, ad_ids[start : start + chunk_size], types
+            )
+            if job:
+                batch_ids.append(job.batch_id)
+    return batch_ids
+
+
+@celery_app.task(
+    bind=True,
+    name="app.workers.analyze_task.poll_bulk_analysis",
+    max_retries=5,
+)
+def poll_bulk_analysis(self, batch_id: str):
+    """
+    Celery task to store the results of a message batch once it has ended.
+
+    Re-schedules itself every ``claude_batch_poll_interval`` seconds while
+    the batch is still processing.
+
+    Args:
+        batch_id: Message batch ID
+    """
+    try:
+        ended = run_async(_poll_bulk_analysis_async(batch_id))
+    except Exception as e:
+        logger.error(f"Polling message batch {batch_id} failed: {e}")
+        raise self.retry(exc=e, countdown=settings.claude_batch_poll_interval)
+
+    if not ended:
+        poll_bulk_analysis.apply_async(
+            (batch_id,), countdown=settings.claude_batch_poll_interval
+        )
+
+
+async def _poll_bulk_analysis_async(batch_id: str) -> bool:
+    """Async implementation of message batch polling."""
     async with async_session() as session:
-        for ad_id in ad_ids:
-            try:
-                if "image" in types:
-                    await analyzer.analyze_image(session, ad_id)
-                if "copy" in types:
-                    await analyzer.analyze_copy(session, ad_id)
-            except Exception as e:
-                logger.error(f"Error analyzing ad {ad_id}: {e}")
-                continue
+        result = await session.execute(
+            select(AnalysisBatchJob).where(AnalysisBatchJob.batch_id == batch_id)
+        )
+        job = result.scalar_one_or_none()
+
+        if not job:
+            logger.error(f"Batch job not found: {batch_id}")
+            return True
+        if job.status == "completed":
+            return True
+
+        return await analyzer.collect_bulk(session, job)
@@ -1,6 +1,12 @@
+import asyncio
+
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 
 from app.config import settings
+from app.core.claude import claude_client
+from app.core.http import http_clients
+from app.core.redis import redis_clients
 
 celery_app = Celery(
     "meta_ads_worker",
@@ -26,8 +32,37 @@ celery_app.conf.update(
     result_expires=86400,  # Results expire after 1 day
 )
 
+# Analysis lanes: requests from the UI go to the interactive queue, bulk and
+# backlog work to a backfill queue. Each lane (and "collect") is served by
+# its own worker pool, so single-ad analyses never wait behind a backfill
+# or a long collect job
+INTERACTIVE_QUEUE = "analyze"
+BACKFILL_QUEUE = "analyze_backfill"
+
 # Task routes
 celery_app.conf.task_routes = {
     "app.workers.collect_task.*": {"queue": "collect"},
-    "app.workers.analyze_task.*": {"queue": "analyze"},
+    "app.workers.analyze_task.scan_analysis_backlog": {"queue": BACKFILL_QUEUE},
+    "app.workers.analyze_task.analyze_bulk": {"queue": BACKFILL_QUEUE},
+    "app.workers.analyze_task.poll_bulk_analysis": {"queue": BACKFILL_QUEUE},
+    # analyze_batch is sent to the backfill queue explicitly when large
+    "app.workers.analyze_task.*": {"queue": INTERACTIVE_QUEUE},
 }
+
+
+@worker_process_init.connect
+def reset_clients(**kwargs):
+    """Drop pooled HTTP, Claude and Redis clients inherited on fork."""
+    http_clients.reset()
+    claude_client.reset()
+    redis_clients.reset()
+
+
+@worker_process_shutdown.connect
+def close_clients(**kwargs):
+    """Close pooled HTTP, Claude and Redis clients when a worker exits."""
+    loop = asyncio.get_event_loop()
+    if not loop.is_closed():
+        loop.run_until_complete(http_clients.aclose())
+        loop.run_until_complete(claude_client.aclose())
+        loop.run_until_complete(redis_clients.aclose())
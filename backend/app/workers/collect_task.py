@@ -1,16 +1,19 @@
 import asyncio
 import logging
-from datetime import datetime
-from typing import List
+from collections import deque
+from datetime import date, datetime
+from typing import Awaitable, Callable, Deque, List, Optional, Set, Tuple
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.config import settings
-from app.models.ad import AdRaw, CollectJob
-from app.services.collector import collector
-from app.services.storage import storage
+from app.core.task_dedup import task_dedup
+from app.models.ad import AdRaw, CollectJob, MonitoringKeyword, MonitoringRun
+from app.services.ad_ingest import IngestResult, build_ad_row, bulk_insert_ads
+from app.services.collector import AdPage, collector
+from app.services.snapshot_pipeline import SnapshotPipeline
 from app.workers.celery_app import celery_app
 
 logger = logging.getLogger(__name__)
@@ -34,7 +37,12 @@ def run_async(coro):
         return loop.run_until_complete(coro)
 
 
-@celery_app.task(bind=True, name="app.workers.collect_task.collect_ads")
+@celery_app.task(
+    bind=True,
+    name="app.workers.collect_task.collect_ads",
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
 def collect_ads(
     self,
     job_id: str,
@@ -42,26 +50,82 @@ def collect_ads(
     industry: str,
     country: str = "KR",
     limit: int = 50,
+    delivered_since: Optional[str] = None,
+    stop_at_known: bool = False,
+    dedup_key: Optional[str] = None,
 ):
     """
     Celery task to collect ads from Meta Ad Library.
 
+    The task is acknowledged only after it finishes, so a job whose worker
+    dies is redelivered and resumes from the job's saved checkpoint. A
+    worker holds the job's in-flight lock while collecting; a copy of the
+    task that finds it taken tries once more after the lock's lease, in
+    case its holder died, and is dropped if the job is still locked.
+
     Args:
         job_id: UUID of the collect job
         keywords: Search keywords
         industry: Industry category
         country: Country code
         limit: Target number of ads to collect
+        delivered_since: ISO date; only fetch ads delivered since then
+        stop_at_known: Stop paging a keyword at a page of already stored ads
+        dedup_key: Queued marker of the request (see ``TaskDedup.claim``),
+            cleared once the job has finished
     """
     logger.info(f"Starting collect task for job {job_id}")
 
     try:
-        run_async(_collect_ads_async(job_id, keywords, industry, country, limit))
+        ran = run_async(
+            _collect_exclusive(
+                job_id,
+                dedup_key,
+                lambda: _collect_ads_async(
+                    job_id,
+                    keywords,
+                    industry,
+                    country,
+                    limit,
+                    delivered_since=(
+                        date.fromisoformat(delivered_since) if delivered_since else None
+                    ),
+                    stop_at_known=stop_at_known,
+                ),
+            )
+        )
     except Exception as e:
         logger.error(f"Collect task failed: {e}")
         run_async(_update_job_status(job_id, "failed", str(e)))
         raise
 
+    if not ran:
+        if self.request.retries:
+            logger.info(f"Job {job_id} is still running elsewhere, dropping duplicate")
+            return
+        logger.info(f"Job {job_id} is running elsewhere, checking again later")
+        raise self.retry(countdown=2 * settings.task_lock_lease, max_retries=1)
+
+
+async def _collect_exclusive(
+    job_id: str, dedup_key: Optional[str], collect: Callable[[], Awaitable]
+) -> bool:
+    """
+    Run a collect job unless another worker holds its lock.
+
+    Returns:
+        False if the job is locked by another worker
+    """
+    async with task_dedup.hold("collect", [job_id]) as held:
+        if not held:
+            return False
+        try:
+            await collect()
+        finally:
+            if dedup_key:
+                await task_dedup.clear("collect", [dedup_key])
+    return True
+
 
 async def _collect_ads_async(
     job_id: str,
@@ -69,101 +133,89 @@ async def _collect_ads_async(
     industry: str,
     country: str,
     limit: int,
+    delivered_since: Optional[date] = None,
+    stop_at_known: bool = False,
 ):
     """Async implementation of ad collection."""
     async with async_session() as session:
+        job = await _get_job(session, job_id)
+        if job and job.status == "completed":
+            logger.info(f"Job {job_id} already completed, skipping")
+            return
+
+        checkpoint = dict(job.checkpoint or {}) if job else {}
+        collected_count = job.collected_count if checkpoint else 0
+        if checkpoint:
+            logger.info(
+                f"Resuming job {job_id} from checkpoint "
+                f"({collected_count} ads already collected)"
+            )
+
         # Update job status to running
         await _update_job_status_db(session, job_id, "running")
 
-        try:
-            # Fetch ads from Meta API
-            ads_data = await collector.search_ads(
-                search_terms=keywords,
-                country=country,
-                limit=limit,
+        fetched_count = 0
+        ingested = IngestResult()
+        seen_ad_ids: Set[str] = set()
+
+        async def store_page(page: AdPage, ads: List[dict], skipped: int) -> None:
+            """Write a page's rows, then commit the checkpoint past them."""
+            nonlocal collected_count, ingested
+            rows = [
+                build_ad_row(ad_data, industry, country, ad_data.get("image_s3_path"))
+                for ad_data in ads
+            ]
+            result = await bulk_insert_ads(session, rows)
+            result.skipped += skipped
+            ingested += result
+            collected_count += result.inserted
+
+            checkpoint[page.term] = page.checkpoint
+            await _update_job_progress(
+                session, job_id, collected_count, checkpoint=dict(checkpoint)
             )
+            await session.commit()
 
-            logger.info(f"Fetched {len(ads_data)} ads from Meta API")
-
-            collected_count = 0
-
-            for ad_data in ads_data:
-                try:
-                    # Check if ad already exists
-                    existing = await session.execute(
-                        select(AdRaw).where(AdRaw.ad_id == ad_data["ad_id"])
-                    )
-                    if existing.scalar_one_or_none():
-                        logger.debug(f"Ad {ad_data['ad_id']} already exists, skipping")
-                        continue
-
-                    # Download and upload image if available
-                    image_s3_path = None
-                    if ad_data.get("ad_snapshot_url"):
-                        image_bytes = await collector.get_ad_snapshot(
-                            ad_data["ad_snapshot_url"]
-                        )
-                        if image_bytes:
-                            image_s3_path = storage.upload_image(
-                                image_bytes, ad_data["ad_id"]
-                            )
-                            ad_data["image_url"] = ad_data["ad_snapshot_url"]
-
-                    # Helper to convert to int safely
-                    def to_int(val):
-                        if val is None:
-                            return None
-                        try:
-                            return int(val)
-                        except (ValueError, TypeError):
-                            return None
-
-                    # Create ad record
-                    ad = AdRaw(
-                        ad_id=ad_data["ad_id"],
-                        page_id=ad_data.get("page_id"),
-                        page_name=ad_data.get("page_name"),
-                        ad_creative_body=ad_data.get("ad_creative_body"),
-                        ad_creative_link_title=ad_data.get("ad_creative_link_title"),
-                        ad_creative_link_description=ad_data.get(
-                            "ad_creative_link_description"
-                        ),
-                        ad_snapshot_url=ad_data.get("ad_snapshot_url"),
-                        start_date=ad_data.get("start_date"),
-                        stop_date=ad_data.get("stop_date"),
-                        platforms=ad_data.get("platforms", []),
-                        currency=ad_data.get("currency"),
-                        spend_lower=to_int(ad_data.get("spend_lower")),
-                        spend_upper=to_int(ad_data.get("spend_upper")),
-                        impressions_lower=to_int(ad_data.get("impressions_lower")),
-                        impressions_upper=to_int(ad_data.get("impressions_upper")),
-                        industry=industry,
-                        image_url=ad_data.get("image_url"),
-                        image_s3_path=image_s3_path,
-                        collected_at=datetime.utcnow(),
+        try:
+            # Pages stream in while earlier ones are still fetching snapshots;
+            # they are stored in arrival order so checkpoints never skip ahead.
+            pending: Deque[Tuple[AdPage, List[dict], int, asyncio.Future]] = deque()
+            async with SnapshotPipeline() as pipeline:
+                async for page in collector.iter_ads(
+                    search_terms=keywords,
+                    country=country,
+                    limit=limit,
+                    resume_from=dict(checkpoint),
+                    delivered_since=delivered_since,
+                    stop_when=_all_ads_known if stop_at_known else None,
+                ):
+                    fetched_count += len(page.ads)
+                    new_ads = await _new_ads(session, page.ads, seen_ad_ids)
+                    snapshots = await pipeline.submit(new_ads)
+                    pending.append(
+                        (page, new_ads, len(page.ads) - len(new_ads), snapshots)
                     )
 
-                    session.add(ad)
-                    collected_count += 1
-
-                    # Update progress
-                    if collected_count % 10 == 0:
-                        await _update_job_progress(session, job_id, collected_count)
-                        await session.commit()
+                    while pending and pending[0][3].done():
+                        page_done, ads, skipped, _ = pending.popleft()
+                        await store_page(page_done, ads, skipped)
 
-                except Exception as e:
-                    logger.error(f"Error processing ad {ad_data.get('ad_id')}: {e}")
-                    continue
+                while pending:
+                    page_done, ads, skipped, snapshots = pending.popleft()
+                    await snapshots
+                    await store_page(page_done, ads, skipped)
 
-            # Final commit
-            await session.commit()
+            logger.info(f"Fetched {fetched_count} ads from Meta API")
 
             # Update job status to completed
             await _update_job_status_db(
                 session, job_id, "completed", collected_count=collected_count
             )
 
-            logger.info(f"Collect task completed: {collected_count} ads collected")
+            logger.info(
+                f"Collect task completed: {collected_count} ads collected "
+                f"({ingested.inserted} new this run, {ingested.skipped} skipped)"
+            )
 
         except Exception as e:
             logger.error(f"Error in collect task: {e}")
@@ -172,6 +224,80 @@ async def _collect_ads_async(
             raise
 
 
+async def _new_ads(
+    session: AsyncSession, ads: List[dict], seen_ad_ids: Set[str]
+) -> List[dict]:
+    """
+    Return the ads of a page that still need storing.
+
+    Ads already seen in this job (the same ad often matches several
+    keywords) or already stored are dropped, using one query per page, so
+    their snapshots are never downloaded. The bulk insert ignores any that
+    race in meanwhile.
+    """
+    unseen = []
+    for ad_data in ads:
+        if ad_data["ad_id"] not in seen_ad_ids:
+            seen_ad_ids.add(ad_data["ad_id"])
+            unseen.append(ad_data)
+
+    if not unseen:
+        return []
+
+    existing_ids = await _existing_ad_ids(
+        session, [ad_data["ad_id"] for ad_data in unseen]
+    )
+    return [ad_data for ad_data in unseen if ad_data["ad_id"] not in existing_ids]
+
+
+async def _existing_ad_ids(session: AsyncSession, ad_ids: List[str]) -> Set[str]:
+    """Return the subset of ``ad_ids`` already stored, in one query."""
+    result = await session.execute(
+        select(AdRaw.ad_id).where(AdRaw.ad_id.in_(set(ad_ids)))
+    )
+    return set(result.scalars())
+
+
+async def _all_ads_known(ads: List[dict]) -> bool:
+    """Whether every ad on a fetched page is already stored."""
+    ad_ids = {ad["ad_id"] for ad in ads}
+    if not ad_ids:
+        return False
+
+    # Runs on the fetch side, concurrently with inserts, so use its own session
+    async with async_session() as session:
+        return len(await _existing_ad_ids(session, list(ad_ids))) == len(ad_ids)
+
+
+def _parse_job_id(job_id: str) -> Optional[UUID]:
+    """Parse a collect job id; None for ids that have no CollectJob row."""
+    try:
+        return UUID(job_id)
+    except ValueError:
+        # Monitoring runs use "monitoring-<run id>"
+        return None
+
+
+def _parse_run_id(job_id: str) -> Optional[int]:
+    """Parse the run id of a monitoring job id ("monitoring-<run id>")."""
+    prefix, _, run_id = job_id.partition("-")
+    if prefix != "monitoring" or not run_id.isdigit():
+        return None
+    return int(run_id)
+
+
+async def _get_job(session: AsyncSession, job_id: str) -> Optional[CollectJob]:
+    """Load a collect job by its UUID."""
+    job_uuid = _parse_job_id(job_id)
+    if job_uuid is None:
+        return None
+
+    result = await session.execute(
+        select(CollectJob).where(CollectJob.job_id == job_uuid)
+    )
+    return result.scalar_one_or_none()
+
+
 async def _update_job_status_db(
     session: AsyncSession,
     job_id: str,
@@ -180,10 +306,12 @@ async def _update_job_status_db(
     error: str = None,
 ):
     """Update job status in database."""
-    result = await session.execute(
-        select(CollectJob).where(CollectJob.job_id == UUID(job_id))
-    )
-    job = result.scalar_one_or_none()
+    run_id = _parse_run_id(job_id)
+    if run_id is not None:
+        await _update_run_status_db(session, run_id, status, collected_count, error)
+        return
+
+    job = await _get_job(session, job_id)
 
     if job:
         job.status = status
@@ -191,21 +319,65 @@ async def _update_job_status_db(
             job.collected_count = collected_count
         if error:
             job.error_message = error
-        if status == "running":
+        # A resumed job keeps the start time of its first attempt
+        if status == "running" and job.started_at is None:
             job.started_at = datetime.utcnow()
         if status in ("completed", "failed"):
             job.completed_at = datetime.utcnow()
         await session.commit()
 
 
-async def _update_job_progress(session: AsyncSession, job_id: str, count: int):
-    """Update job progress."""
-    result = await session.execute(
-        select(CollectJob).where(CollectJob.job_id == UUID(job_id))
+async def _update_run_status_db(
+    session: AsyncSession,
+    run_id: int,
+    status: str,
+    collected_count: int = None,
+    error: str = None,
+):
+    """
+    Update a monitoring run's status in database.
+
+    A completed run advances its keyword's incremental mark to the time the
+    run started, so the next run fetches everything delivered since then.
+    Failed runs leave the mark where it was.
+    """
+    run = await session.get(MonitoringRun, run_id)
+    if not run:
+        return
+
+    run.status = status
+    if collected_count is not None:
+        run.new_ads_count = collected_count
+    if error:
+        run.error_message = error
+    if status in ("completed", "failed"):
+        run.completed_at = datetime.utcnow()
+    if status == "completed":
+        await session.execute(
+            update(MonitoringKeyword)
+            .where(MonitoringKeyword.id == run.keyword_id)
+            .values(last_success_at=run.started_at)
+        )
+    await session.commit()
+
+
+async def _update_job_progress(
+    session: AsyncSession,
+    job_id: str,
+    count: int,
+    checkpoint: Optional[dict] = None,
+):
+    """Update job progress and, if given, its resume checkpoint."""
+    job_uuid = _parse_job_id(job_id)
+    if job_uuid is None:
+        return
+
+    values = {"collected_count": count}
+    if checkpoint is not None:
+        values["checkpoint"] = checkpoint
+    await session.execute(
+        update(CollectJob).where(CollectJob.job_id == job_uuid).values(**values)
     )
-    job = result.scalar_one_or_none()
-    if job:
-        job.collected_count = count
 
 
 async def _update_job_status(job_id: str, status: str, error: str = None):
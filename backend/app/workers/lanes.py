@@ -0,0 +1,130 @@
+"""Depth and queue wait metrics of the Celery queues (analysis lanes)."""
+
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import redis
+from celery.signals import before_task_publish, task_prerun
+
+from app.config import settings
+from app.workers.celery_app import BACKFILL_QUEUE, INTERACTIVE_QUEUE, celery_app
+
+logger = logging.getLogger(__name__)
+
+# Queues reported by get_metrics
+LANES = (INTERACTIVE_QUEUE, BACKFILL_QUEUE, "collect")
+# Waits kept per queue for percentiles
+RECENT_WAITS = 200
+
+
+class LaneMetrics:
+    """
+    Queue depth and wait time per Celery queue.
+
+    Every published task is stamped with its enqueue time. When a worker
+    starts it, the time it waited in its queue (counted from its ETA for
+    delayed tasks) is recorded in Redis, shared by all workers.
+    """
+
+    def __init__(self):
+        self._redis: Optional[redis.Redis] = None
+
+    def depth(self, queue: str) -> int:
+        """Number of tasks waiting in a broker queue (a Redis list)."""
+        try:
+            with celery_app.connection_for_read() as connection:
+                return connection.default_channel.client.llen(queue)
+        except Exception as e:
+            logger.warning(f"Could not read depth of queue {queue}: {e}")
+            return 0
+
+    def record_wait(self, queue: str, seconds: float) -> None:
+        """Record how long a task waited in its queue before starting."""
+        try:
+            pipe = self._client().pipeline(transaction=False)
+            pipe.hincrby(self._key(queue), "started", 1)
+            pipe.hincrbyfloat(self._key(queue), "total_wait", seconds)
+            pipe.lpush(self._key(queue, "recent"), seconds)
+            pipe.ltrim(self._key(queue, "recent"), 0, RECENT_WAITS - 1)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Recording wait of queue {queue} failed: {e}")
+
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        """Depth and wait statistics of each lane."""
+        client = self._client()
+        metrics = []
+        for queue in LANES:
+            values = client.hgetall(self._key(queue))
+            recent = sorted(
+                float(value)
+                for value in client.lrange(self._key(queue, "recent"), 0, -1)
+            )
+            started = int(values.get(b"started", 0))
+            total_wait = float(values.get(b"total_wait", 0.0))
+            metrics.append(
+                {
+                    "queue": queue,
+                    "depth": self.depth(queue),
+                    "started": started,
+                    "average_wait_seconds": (
+                        round(total_wait / started, 3) if started else 0.0
+                    ),
+                    "p50_wait_seconds": _percentile(recent, 0.5),
+                    "p95_wait_seconds": _percentile(recent, 0.95),
+                }
+            )
+        return metrics
+
+    def _client(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(settings.redis_url)
+        return self._redis
+
+    def _key(self, queue: str, part: str = "metrics") -> str:
+        return f"lanes:{queue}:{part}"
+
+
+# Singleton instance
+lane_metrics = LaneMetrics()
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values; 0 when empty."""
+    if not values:
+        return 0.0
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 3)
+
+
+def task_lane(request: Any) -> Optional[str]:
+    """Queue a task was delivered from."""
+    return (getattr(request, "delivery_info", None) or {}).get("routing_key")
+
+
+@before_task_publish.connect
+def stamp_enqueue_time(headers: Optional[dict] = None, **kwargs):
+    """Stamp published tasks with their enqueue time."""
+    if headers is not None:
+        headers.setdefault("enqueued_at", time.time())
+
+
+@task_prerun.connect
+def record_queue_wait(task: Any = None, **kwargs):
+    """Record the queue wait of a starting task."""
+    request = task.request
+    queue = task_lane(request)
+    enqueued_at = getattr(request, "enqueued_at", None) or (
+        getattr(request, "headers", None) or {}
+    ).get("enqueued_at")
+    if not queue or not enqueued_at:
+        return
+
+    # Delayed tasks are due at their ETA, not when published
+    ready_at = float(enqueued_at)
+    eta = request.eta
+    if eta:
+        eta = datetime.fromisoformat(eta) if isinstance(eta, str) else eta
+        ready_at = max(ready_at, eta.timestamp())
+    lane_metrics.record_wait(queue, max(0.0, time.time() - ready_at))
@@ -231,6 +231,7 @@ export interface MonitoringKeyword {
   is_active: boolean;
   schedule_cron: string;
   last_run_at: string | null;
+  last_success_at: string | null;
   next_run_at: string | null;
   created_at: string;
 }